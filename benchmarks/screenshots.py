@@ -0,0 +1,70 @@
+"""Benchmark embedding screenshots in a synthetic output.xml.
+
+Usage: python benchmarks/screenshots.py [SCREENSHOTS] [FILLER_LINES]
+"""
+
+import os
+import re
+import sys
+import time
+from tempfile import TemporaryDirectory
+
+from PIL import Image
+
+from robotframework_interpreter.utils import process_screenshots, screenshot_data_uri
+
+
+def write_output(outputdir, screenshots, filler):
+    lines = ["<robot>"]
+    for index in range(screenshots):
+        filename = f"screenshot-{index}.png"
+        Image.new("RGB", (64, 64), (index % 256, 0, 0)).save(os.path.join(outputdir, filename))
+        lines.extend(
+            f'<msg level="INFO">Filler message {index}-{line}</msg>'
+            for line in range(filler)
+        )
+        lines.append(
+            '<msg level="INFO" html="true">&lt;/td&gt;&lt;/tr&gt;&lt;tr&gt;&lt;td colspan="3"&gt;'
+            f'&lt;a href="{filename}"&gt;&lt;img src="{filename}" width="800px"&gt;&lt;/a&gt;</msg>'
+        )
+    lines.append("</robot>")
+
+    with open(os.path.join(outputdir, "output.xml"), "w", encoding="utf-8") as fp:
+        fp.write("\n".join(lines))
+
+
+def replace_per_screenshot(outputdir):
+    """The previous implementation: the whole document is scanned for every screenshot."""
+    with open(os.path.join(outputdir, "output.xml"), encoding="utf-8") as fp:
+        xml = fp.read()
+
+    for src in re.findall('img src="([^"]+)', xml):
+        uri = screenshot_data_uri(src, outputdir)
+        xml = xml.replace('a href="{}"'.format(src), "a")
+        xml = xml.replace(
+            'img src="{}" width="800px"'.format(src),
+            'img src="{}" style="max-width:800px;"'.format(uri),
+        )
+        xml = xml.replace('img src="{}"'.format(src), 'img src="{}"'.format(uri))
+
+    with open(os.path.join(outputdir, "output.xml"), "w", encoding="utf-8") as fp:
+        fp.write(xml)
+
+
+def bench(function, screenshots, filler):
+    with TemporaryDirectory() as outputdir:
+        write_output(outputdir, screenshots, filler)
+        size = os.path.getsize(os.path.join(outputdir, "output.xml"))
+        start = time.perf_counter()
+        function(outputdir)
+        return size, time.perf_counter() - start
+
+
+def main(screenshots=500, filler=20):
+    for function in (replace_per_screenshot, process_screenshots):
+        size, elapsed = bench(function, screenshots, filler)
+        print(f"{function.__name__:<24} {screenshots} screenshots, {size / 1e6:.1f} MB: {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -1,10 +1,44 @@
+import importlib
+import sys
+
 from .listeners import (  # noqa
     GlobalVarsListener, RobotKeywordsIndexerListener,
     SeleniumConnectionsListener, PlaywrightConnectionsListener,
     JupyterConnectionsListener, AppiumConnectionsListener,
-    WhiteLibraryListener, ReturnValueListener, StatusEventListener
-)
-from .interpreter import (  # noqa
-    init_suite, execute, complete, inspect,
-    shutdown_drivers, ProgressUpdater
+    WhiteLibraryListener, ReturnValueListener, StatusEventListener,
+    KeywordProfilerListener
 )
+from .utils import ScreenshotOptions  # noqa
+from .artifacts import ArtifactStore  # noqa
+from .parallel import WorkerPool  # noqa
+from .metrics import PhaseMetrics, SESSION_METRICS  # noqa
+
+# Exports of the modules depending on IPython and ipywidgets, imported on first use so that the worker
+# processes running tests in parallel, which import this package, do not import them
+LAZY_EXPORTS = {
+    "init_suite": "interpreter",
+    "execute": "interpreter",
+    "execute_async": "interpreter",
+    "execute_many": "interpreter",
+    "complete": "interpreter",
+    "inspect": "interpreter",
+    "shutdown_drivers": "interpreter",
+    "ProgressUpdater": "interpreter",
+    "reset_log_viewer": "report",
+    "open_artifact": "report",
+    "SessionResult": "session",
+}
+
+
+def _import_export(name):
+    return getattr(importlib.import_module(f".{LAZY_EXPORTS[name]}", __name__), name)
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name not in LAZY_EXPORTS:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        return _import_export(name)
+else:
+    # Module __getattr__ is not supported before Python 3.7
+    globals().update({name: _import_export(name) for name in LAZY_EXPORTS})
@@ -0,0 +1,163 @@
+"""Content-addressed on-disk store of execution outputs (output.xml, screenshots, log.html)."""
+
+from hashlib import sha256
+import os
+import shutil
+from tempfile import mkdtemp
+from threading import Lock
+import time
+
+from .utils import copy_output
+
+
+DEFAULT_ARTIFACTS_DIR = os.path.join(os.path.expanduser("~"), ".cache", "robotframework-interpreter", "artifacts")
+
+STAGING_PREFIX = ".staging-"
+
+
+def get_directory_size(path: str):
+    """Get the total size of the files of a directory."""
+    return sum(
+        os.path.getsize(os.path.join(root, filename))
+        for root, _, filenames in os.walk(path)
+        for filename in filenames
+    )
+
+
+def get_directory_hash(path: str):
+    """Get a hash of the relative paths and contents of the files of a directory."""
+    digest = sha256()
+    for root, dirs, filenames in os.walk(path):
+        dirs.sort()
+        for filename in sorted(filenames):
+            filepath = os.path.join(root, filename)
+            digest.update(os.path.relpath(filepath, path).encode("utf-8") + b"\0")
+            with open(filepath, "rb") as fp:
+                for chunk in iter(lambda: fp.read(1 << 16), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """A directory keeping execution outputs under the hash of their content.
+
+    Artifacts not used for more than max_age seconds are evicted, then the least recently used ones
+    until the store fits in max_size bytes. None disables the corresponding limit.
+    The size of an artifact is recorded when it is stored, or when first needed for the ones stored by
+    other processes, so that evicting does not walk the whole store."""
+
+    def __init__(self, root: str = DEFAULT_ARTIFACTS_DIR, max_size: int = 500 * 1024 * 1024,
+                 max_age: float = 7 * 24 * 3600):
+        self.root = root
+        self.max_size = max_size
+        self.max_age = max_age
+        self._lock = Lock()
+        self._sizes = {}
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str):
+        return os.path.join(self.root, key)
+
+    def keys(self):
+        return [
+            name for name in os.listdir(self.root)
+            if not name.startswith(STAGING_PREFIX) and os.path.isdir(self.path(name))
+        ]
+
+    def put(self, outputdir: str, result=None):
+        """Store the output.xml of an output directory, or the result saved as output.xml if given, along with
+        the screenshots it references. The other files of the output directory are not stored.
+
+        Returns the key of the artifact."""
+        staging = mkdtemp(prefix=STAGING_PREFIX, dir=self.root)
+        try:
+            artifact = os.path.join(staging, "artifact")
+            copy_output(outputdir, artifact, result)
+            key = get_directory_hash(artifact)
+            size = get_directory_size(artifact)
+
+            with self._lock:
+                if not os.path.exists(self.path(key)):
+                    os.replace(artifact, self.path(key))
+                    self._sizes[key] = size
+                self.touch(key)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        self.evict(keep=key)
+        return key
+
+    def get(self, key: str):
+        """Get the directory of an artifact, None if it does not exist (anymore)."""
+        path = self.path(key)
+        if not os.path.isdir(path):
+            return None
+        self.touch(key)
+        return path
+
+    def touch(self, key: str):
+        os.utime(self.path(key))
+
+    def artifact_size(self, key: str):
+        """Get the recorded size of an artifact."""
+        if key not in self._sizes:
+            self._sizes[key] = get_directory_size(self.path(key))
+        return self._sizes[key]
+
+    def refresh(self, key: str):
+        """Record the size of an artifact again, e.g. once its log is rendered."""
+        with self._lock:
+            self._sizes[key] = get_directory_size(self.path(key))
+
+    def evict(self, keep: str = None):
+        """Remove the expired artifacts, then the least recently used ones if the store is too big."""
+        with self._lock:
+            now = time.time()
+            artifacts = sorted(
+                (os.path.getmtime(self.path(key)), key) for key in self.keys() if key != keep
+            )
+
+            for mtime, key in list(artifacts):
+                if self.max_age is not None and now - mtime > self.max_age:
+                    self._remove(key)
+                    artifacts.remove((mtime, key))
+
+            if self.max_size is None:
+                return
+
+            total = sum(self.artifact_size(key) for _, key in artifacts)
+            total += self.artifact_size(keep) if keep is not None else 0
+            for _, key in artifacts:
+                if total <= self.max_size:
+                    break
+                total -= self.artifact_size(key)
+                self._remove(key)
+
+    def _remove(self, key: str):
+        shutil.rmtree(self.path(key), ignore_errors=True)
+        self._sizes.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            for key in self.keys():
+                self._remove(key)
+
+    def size(self):
+        return sum(self.artifact_size(key) for key in self.keys())
+
+    def __contains__(self, key):
+        return os.path.isdir(self.path(key))
+
+    def __len__(self):
+        return len(self.keys())
+
+
+_default_store = None
+
+
+def get_artifact_store():
+    """Get the default artifact store, creating it on first use."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ArtifactStore()
+    return _default_store
@@ -0,0 +1,76 @@
+"""Bounded caches used to avoid redoing work between cell executions."""
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache:
+    """A bounded least-recently-used mapping which keeps hit/miss counts.
+
+    It holds at most maxsize items and, if maxbytes is given, items of at most maxbytes in total, the size
+    of an item being given by sizeof. Items bigger than maxbytes are not cached."""
+
+    def __init__(self, maxsize: int = 128, maxbytes: int = None, sizeof=len):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.currbytes = 0
+        self._items = OrderedDict()
+        self._sizes = {}
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            self._remove(key)
+            if self.maxbytes is not None and size > self.maxbytes:
+                return value
+            self._items[key] = value
+            self._sizes[key] = size
+            self.currbytes += size
+            while len(self._items) > self.maxsize or (self.maxbytes is not None and self.currbytes > self.maxbytes):
+                self._remove(next(iter(self._items)))
+        return value
+
+    def _remove(self, key):
+        if key in self._items:
+            del self._items[key]
+            self.currbytes -= self._sizes.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self.currbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Return the cache statistics."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "maxsize": self.maxsize,
+            "currsize": len(self._items),
+            "maxbytes": self.maxbytes,
+            "currbytes": self.currbytes,
+        }
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
@@ -27,6 +27,10 @@ BUILTIN_VARIABLES = [
 
 NAME_REGEXP = re.compile("`(.+?)`")
 
+IMG_SRC_REGEXP = re.compile('img src="([^"]+)')
+
+SCREENSHOT_REGEXP = re.compile('a href="([^"]+)"|img src="([^"]+)"( width="800px")?')
+
 CONTEXT_LIBRARIES = {
     "__root__": list(
         map(
@@ -346,3 +350,112 @@ a.style = (
 );
 w.document.body.append(a);
 """
+
+SCRIPT_DISPLAY_COMPRESSED_LOG = """\
+var content = '{content}';
+
+var w = window.open('', '', 'width=900,height=900');
+w.document.body.style = 'margin:0; overflow: hidden;';
+
+var i = w.document.createElement('iframe');
+i.style = (
+  'position:absolute;' +
+  'left: 0px; width: 100%;' +
+  'top: 0px; height: 100%;' +
+  'border-width: 0;'
+);
+w.document.body.append(i);
+
+var a = w.document.createElement('a');
+a.appendChild(w.document.createTextNode('Download'));
+a.download = '{filename}';
+a.style = (
+  'position:fixed;top:0;right:0;' +
+  'color:white;background:black;text-decoration:none;' +
+  'font-weight:bold;padding:7px 14px;border-radius:0 0 0 5px;'
+);
+w.document.body.append(a);
+
+var bytes = Uint8Array.from(atob(content), function (c) {{ return c.charCodeAt(0); }});
+var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+new Response(stream).blob().then(function (blob) {{
+  var url = URL.createObjectURL(new Blob([blob], {{type: 'text/html'}}));
+  i.src = url;
+  a.href = url;
+}});
+"""
+
+SCRIPT_DISPLAY_VIEWER_LOG = """\
+var templates = window.robotLogTemplates = window.robotLogTemplates || {{}};
+var element = document.getElementById('{template_id}');
+if (element) {{
+  templates['{template_id}'] = element.dataset.template;
+}} else if (!templates['{template_id}']) {{
+  try {{
+    templates['{template_id}'] = localStorage.getItem('{template_id}');
+  }} catch (e) {{}}
+}}
+
+if (!templates['{template_id}']) {{
+  alert('The Robot Framework log viewer is not loaded in this page, restart the kernel and execute the cell again to reload it.');
+}} else {{
+  var content = '{content}';
+
+  var w = window.open('', '', 'width=900,height=900');
+  w.document.body.style = 'margin:0; overflow: hidden;';
+
+  var i = w.document.createElement('iframe');
+  i.style = (
+    'position:absolute;' +
+    'left: 0px; width: 100%;' +
+    'top: 0px; height: 100%;' +
+    'border-width: 0;'
+  );
+  w.document.body.append(i);
+
+  var a = w.document.createElement('a');
+  a.appendChild(w.document.createTextNode('Download'));
+  a.download = '{filename}';
+  a.style = (
+    'position:fixed;top:0;right:0;' +
+    'color:white;background:black;text-decoration:none;' +
+    'font-weight:bold;padding:7px 14px;border-radius:0 0 0 5px;'
+  );
+  w.document.body.append(a);
+
+  var inflate = function (data) {{
+    var bytes = Uint8Array.from(atob(data), function (c) {{ return c.charCodeAt(0); }});
+    return new Response(new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'))).text();
+  }};
+  Promise.all([inflate(templates['{template_id}']), inflate(content)]).then(function (parts) {{
+    var html = parts[0].replace('{placeholder}', function () {{ return parts[1]; }});
+    var url = URL.createObjectURL(new Blob([html], {{type: 'text/html'}}));
+    i.src = url;
+    a.href = url;
+  }});
+}}
+"""
+
+# The template is kept by the page and the browser once rendered, so that the reports outlive the output shipping it
+HTML_LOG_TEMPLATE = """\
+<div id="{template_id}" data-template="{content}" hidden></div>
+<script>
+(function () {{
+  var script = document.currentScript;
+  var element = (script && script.previousElementSibling) || document.getElementById('{template_id}');
+  if (!element) {{
+    return;
+  }}
+  var templates = window.robotLogTemplates = window.robotLogTemplates || {{}};
+  templates['{template_id}'] = element.dataset.template;
+  try {{
+    Object.keys(localStorage).forEach(function (key) {{
+      if (key.indexOf('robot-log-template-') === 0 && key !== '{template_id}') {{
+        localStorage.removeItem(key);
+      }}
+    }});
+    localStorage.setItem('{template_id}', element.dataset.template);
+  }} catch (e) {{}}
+}})();
+</script>
+"""
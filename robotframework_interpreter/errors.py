@@ -0,0 +1,36 @@
+"""Collection of the errors logged by Robot Framework during an execution, in the kernel and in worker processes."""
+
+from contextlib import contextmanager
+
+from robot.output import LOGGER
+from robot.utils import get_error_details
+
+
+class ErrorCollector:
+    """Robot Framework error listener collecting error details while it is armed.
+
+    The same instance is registered to the LOGGER for every execution, so that no
+    listener or traceback outlives the execution it was created for."""
+
+    def __init__(self):
+        self.errors = []
+        self.armed = False
+
+    def __call__(self):
+        if self.armed:
+            self.errors.extend(get_error_details())
+
+    @contextmanager
+    def capture(self):
+        """Arm the collector, yielding the list of errors raised in the block."""
+        self.errors = []
+        self.armed = True
+        LOGGER.register_error_listener(self)
+        try:
+            yield self.errors
+        finally:
+            self.armed = False
+
+
+# Session-wide collector of Robot Framework errors
+ERROR_COLLECTOR = ErrorCollector()
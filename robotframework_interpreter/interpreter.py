@@ -1,40 +1,57 @@
 """Utility functions for creating an interpreter."""
 
-from collections import OrderedDict
-from copy import deepcopy
-from io import StringIO
+import asyncio
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import copy, deepcopy
+from hashlib import sha256
+from io import StringIO, TextIOBase
 import os
 import re
 from functools import partial
+from html import escape
 from tempfile import TemporaryDirectory
+from threading import Lock, RLock, Timer, current_thread, main_thread
+import time
 from typing import List
 
 from IPython.core.display import display
 
-from robot.api import get_model
-from robot.errors import DataError
-from robot.reporting import ResultWriter
+from robot.api import ExecutionResult, get_model
+from robot.errors import DataError, ExecutionFailed
+from robot.result import Result, TestSuite as ResultSuite
 from robot.running.model import TestSuite
 from robot.running.builder.testsettings import TestDefaults
 from robot.running.builder.parsers import ErrorReporter
 from robot.running.builder.transformers import SettingsBuilder, SuiteBuilder
 from robot.model.itemlist import ItemList
-from robot.output import LOGGER
-from robot.utils import get_error_details
+from robot.running import timeouts as robot_timeouts
+from robot.running.signalhandler import STOP_SIGNAL_MONITOR
+from robot.running.timeouts.windows import Timeout as ThreadTimeout
 
 from ipywidgets import VBox, HBox, Button, Output, Text
 
+from .robot_version import ROBOT_MAJOR_VERSION
 from .utils import (
-    detect_robot_context, line_at_cursor, scored_results,
+    ScreenshotOptions, detect_robot_context, line_at_cursor, scored_results,
     complete_libraries, get_lunr_completions, remove_prefix,
-    display_log, process_screenshots, lunr_query, get_keyword_doc
+    lunr_query, get_keyword_doc
 )
 from .selectors import (
     BrokenOpenConnection, clear_selector_highlights, get_autoit_selector_completions, get_selector_completions,
     get_white_selector_completions, get_win32_selector_completions, is_autoit_selector,
     is_selector, is_white_selector, is_win32_selector, close_current_connection, yield_current_connection
 )
+from .cache import LRUCache
 from .constants import VARIABLE_REGEXP, BUILTIN_VARIABLES
+from .artifacts import ArtifactStore
+from .report import LOG_MODES, generate_report
+from .session import SessionResult
+from .errors import ERROR_COLLECTOR
+from .metrics import PhaseMetrics, TimedListener, measure, timed
+from .parallel import WorkerError, WorkerPool, get_library_names, run_parallel
+from .store import ResourceJournal, get_resource_index
 from .listeners import (
     GlobalVarsListener, RobotKeywordsIndexerListener,
     SeleniumConnectionsListener, StatusEventListener
@@ -54,6 +71,10 @@ def get_source(self):
 UserKeyword.source = property(get_source)
 
 
+# Parsed models and built suite fragments of the last executed cells
+PARSE_CACHE = LRUCache(maxsize=32)
+
+
 def normalize_argument(name):
     if "=" in name:
         name, default = name.split("=", 1)
@@ -144,25 +165,254 @@ class TestSuiteError(Exception):
     pass
 
 
-class ProgressUpdater(StringIO):
+class ExecutionCanceller:
+    """Stop a Robot Framework execution at the next keyword boundary once cancelled.
+
+    This reuses the graceful stop Robot Framework performs on a first SIGINT: the running tests fail
+    with the cancellation reason and the remaining ones are not run. Teardowns are still executed."""
+
+    def __init__(self):
+        self.reason = None
+        self.running = False
+        self._lock = RLock()
+
+    def cancel(self, reason: str = "Execution cancelled"):
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+                if self.running:
+                    STOP_SIGNAL_MONITOR._signal_count += 1
+
+    def _stop_execution(self):
+        raise ExecutionFailed(self.reason, exit=True)
+
+    @contextmanager
+    def armed(self):
+        """Make the execution run in the block stoppable."""
+        with self._lock:
+            self.running = True
+            STOP_SIGNAL_MONITOR._stop_execution_gracefully = self._stop_execution
+            if self.reason is not None:
+                STOP_SIGNAL_MONITOR._signal_count += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self.running = False
+                del STOP_SIGNAL_MONITOR._stop_execution_gracefully
+                STOP_SIGNAL_MONITOR._signal_count = 0
+
+
+# Robot Framework timeout implementation of the platform, using signals on POSIX systems
+_SIGNAL_TIMEOUT = robot_timeouts.Timeout
+_thread_timeouts_lock = Lock()
+_thread_timeouts_count = 0
+
+
+def _any_thread_timeout(timeout, error):
+    if current_thread() is main_thread():
+        return _SIGNAL_TIMEOUT(timeout, error)
+    return ThreadTimeout(timeout, error)
+
+
+@contextmanager
+def thread_timeouts():
+    """Make Robot Framework test and keyword timeouts work outside of the main thread in the block.
+
+    Signals can only be handled on the main thread, the timeouts of the other threads are raised
+    in them from a timer thread instead, as Robot Framework does on Windows."""
+    global _thread_timeouts_count
+    with _thread_timeouts_lock:
+        _thread_timeouts_count += 1
+        robot_timeouts.Timeout = _any_thread_timeout
+    try:
+        yield
+    finally:
+        with _thread_timeouts_lock:
+            _thread_timeouts_count -= 1
+            if _thread_timeouts_count == 0:
+                robot_timeouts.Timeout = _SIGNAL_TIMEOUT
+
+
+class RingBufferStream(TextIOBase):
+    """Text stream keeping only the last max_lines lines and max_bytes bytes (UTF-8) written to it.
+
+    None disables a limit. Everything written can also be spilled to a file, given as a path or a file object."""
+
+    def __init__(self, max_lines=1000, max_bytes=1024 * 1024, spill=None):
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.dropped_lines = 0
+
+        self._lines = deque()
+        self._size = 0
+        self._close_spill = isinstance(spill, str)
+        self.spill = open(spill, "a", encoding="utf-8") if self._close_spill else spill
+
+    def write(self, s):
+        if self.spill is not None:
+            self.spill.write(s)
+
+        lines = s.splitlines(keepends=True)
+        if lines and self._lines and not self._lines[-1].endswith("\n"):
+            partial = self._lines.pop()
+            self._size -= len(partial.encode("utf-8"))
+            lines[0] = partial + lines[0]
+        for line in lines:
+            self._lines.append(line)
+            self._size += len(line.encode("utf-8"))
+        self._evict()
+
+        return len(s)
+
+    def _evict(self):
+        while len(self._lines) > 1 and (
+            (self.max_lines is not None and len(self._lines) > self.max_lines) or
+            (self.max_bytes is not None and self._size > self.max_bytes)
+        ):
+            self._size -= len(self._lines.popleft().encode("utf-8"))
+            self.dropped_lines += 1
+
+        # A single line bigger than the limit only keeps its end
+        if self.max_bytes is not None and self._size > self.max_bytes:
+            line = self._lines.pop().encode("utf-8")[-self.max_bytes:].decode("utf-8", "ignore")
+            self._lines.append(line)
+            self._size = len(line.encode("utf-8"))
+
+    def getvalue(self):
+        return "".join(self._lines)
+
+    def flush(self):
+        if self.spill is not None:
+            self.spill.flush()
+
+    def close(self):
+        super(RingBufferStream, self).close()
+        if self._close_spill and not self.spill.closed:
+            self.spill.close()
+
+
+class ProgressUpdater(RingBufferStream):
     """Wrapper designed to capture robot.api.logger.console and display it.
-    This can be used passing an instance of this to the execute's stdout argument"""
+    This can be used passing an instance of this to the execute's stdout argument.
+    Only the end of the console output is kept, see RingBufferStream for the buffer options.
+    With stream_results, a row is displayed for each finished test: all failures and the max_rows latest ones.
+    Updates are coalesced to at most max_frequency per second, the latest state being always displayed.
+    The tests done/total counts and the estimated remaining time are displayed as well, the estimation being
+    based on the durations of the tests with the same names in earlier executions."""
 
     colors = re.compile(r"\[[0-?]+[^m]+m")
 
-    def __init__(self, display, update_display):
+    status_colors = {
+        "PASS": "var(--jp-success-color1, green)",
+        "FAIL": "var(--jp-error-color1, red)",
+        "SKIP": "var(--jp-warn-color1, orange)",
+    }
+    status_labels = {"PASS": "passed", "FAIL": "failed", "SKIP": "skipped"}
+
+    # Last durations of the tests by name, shared by the progress updaters of the session
+    durations = {}
+
+    def __init__(self, display, update_display, stream_results=False, max_rows=10, max_frequency=10, **buffer_options):
         self.display = display
         self.update_display = update_display
+        self.stream_results = stream_results
+        self.max_rows = max_rows
+        self.min_interval = 1 / max_frequency if max_frequency else 0
 
         self.progress = {"test": "n/a", "keyword": "n/a", "message": None}
+        self.results = []
+        self.total = None
+        self.pending = []
+        self.test_start = None
         self.already_displayed = False
 
-        super(ProgressUpdater, self).__init__()
+        self._lock = RLock()
+        self._last_update = 0
+        self._timer = None
+
+        super(ProgressUpdater, self).__init__(**buffer_options)
+
+    def _result_rows(self):
+        counts = OrderedDict((status, 0) for status in self.status_colors)
+        for result in self.results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        summary = ", ".join(
+            f"{count} {self.status_labels.get(status, status.lower())}" for status, count in counts.items()
+        )
+
+        latest = len(self.results) - self.max_rows
+        rows = "".join(
+            f'<tr><td style="color:{self.status_colors.get(result["status"], "inherit")};">{result["status"]}</td>'
+            f'<td>{escape(result["name"])}</td><td>{result["elapsed"]:.2f}s</td>'
+            f'<td>{escape(result["message"])}</td></tr>'
+            for index, result in enumerate(self.results)
+            if index >= latest or result["status"] == "FAIL"
+        )
+
+        return (
+            f'<div style="padding-left:1ex;">{summary}</div>'
+            f'<table style="margin-left:1ex;">{rows}</table>'
+        )
 
     def _update(self):
+        with self._lock:
+            if self._timer is not None:
+                # The pending update will display the latest state
+                return
+            delay = self._last_update + self.min_interval - time.monotonic()
+            if delay <= 0:
+                self._send()
+            else:
+                self._timer = Timer(delay, self.flush_display)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush_display(self):
+        """Display the latest state right away, if an update is pending."""
+        with self._lock:
+            if self._timer is None:
+                return
+            self._timer.cancel()
+            self._timer = None
+            self._send()
+
+    def estimate_remaining(self):
+        """Get the estimated remaining time of the execution in seconds, None if it cannot be estimated."""
+        known = [self.durations[name] for name in self.pending if name in self.durations]
+        completed = [result["elapsed"] for result in self.results]
+        samples = known + completed
+        if not samples:
+            return None
+
+        average = sum(samples) / len(samples)
+        unknown = self.total - len(self.results) - len(known)
+        remaining = sum(known) + average * unknown
+        if self.test_start is not None and self.progress["test"] in self.pending:
+            remaining -= min(
+                time.monotonic() - self.test_start, self.durations.get(self.progress["test"], average)
+            )
+        return max(remaining, 0)
+
+    def _progress_summary(self):
+        if not self.total:
+            return None
+
+        done = len(self.results)
+        summary = f"{done}/{self.total} ({100 * done // self.total}%)"
+        remaining = self.estimate_remaining()
+        if remaining is not None:
+            minutes, seconds = divmod(int(remaining), 60)
+            summary += f" ETA {minutes}m{seconds:02d}s" if minutes else f" ETA {seconds}s"
+        return summary
+
+    def _send(self):
+        self._last_update = time.monotonic()
+
         status_line = " | ".join(
             str(s)
             for s in [
+                self._progress_summary(),
                 self.progress["test"],
                 self.progress["keyword"],
                 self.progress["message"],
@@ -174,6 +424,8 @@ class ProgressUpdater(StringIO):
             "text/html": f'<pre style="white-space:nowrap;overflow:hidden;padding-left:1ex;'
                          f'"><i class="fa fa-spinner fa-pulse"></i>{status_line}</pre>'
         }
+        if self.stream_results and self.results:
+            mimebundle["text/html"] = self._result_rows() + mimebundle["text/html"]
 
         if not self.already_displayed:
             self.display(mimebundle)
@@ -182,16 +434,33 @@ class ProgressUpdater(StringIO):
             self.update_display(mimebundle)
 
     def update(self, data):
-        if "test" in data:
+        if "suite" in data:
+            # The first suite is the executed one, child suites only tell their test names
+            if self.total is None:
+                self.total = data["total"]
+            self.pending.extend(data["tests"])
+        elif "test" in data:
             self.progress["test"] = data["test"]
             self.progress["message"] = None
+            self.test_start = time.monotonic()
         elif "keyword" in data:
             self.progress["keyword"] = data["keyword"]
             self.progress["message"] = None
+        elif "test_result" in data:
+            result = data["test_result"]
+            self.results.append(result)
+            self.durations[result["name"]] = result["elapsed"]
+            if result["name"] in self.pending:
+                self.pending.remove(result["name"])
+            self.test_start = None
         self._update()
 
     def clear(self):
-        self.update_display({"text/plain": ""})
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.update_display({"text/plain": ""})
 
     def write(self, s):
         self.progress["message"] = s.strip()
@@ -214,83 +483,109 @@ def init_suite(name: str, source: str = os.getcwd()):
     return TestSuite(name=name, source=source)
 
 
-def generate_report(suite: TestSuite, outputdir: str):
-    process_screenshots(outputdir)
-
-    writer = ResultWriter(os.path.join(outputdir, "output.xml"))
-    writer.write_results(
-        log=os.path.join(outputdir, "log.html"),
-        report=None,
-        rpa=getattr(suite, "rpa", False),
+def get_cache_key(code: str, suite: TestSuite, defaults: TestDefaults, curdir: str):
+    """Get the parse cache key of a cell, given the state it will be built against."""
+    defaults_state = (
+        defaults.setup, defaults.teardown, defaults.force_tags,
+        defaults.default_tags, defaults.template, defaults.timeout
+    )
+    return (
+        sha256(code.encode("utf-8")).hexdigest(),
+        repr(defaults_state), suite.source, curdir
     )
 
-    with open(os.path.join(outputdir, "log.html"), "rb") as fp:
-        log = fp.read()
-        log = log.replace(b'"reportURL":"report.html"', b'"reportURL":null')
 
-    html = """
-        <button
-          class="jp-mod-styled jp-mod-accept"
-          onClick="{};event.preventDefault();event.stopPropagation();"
-        >
-            <i class="fa fa-file" aria-hidden="true"></i>
-            Log
-        </button>
-        """.format(display_log(log, "log.html"))
+def build_cell(code: str, suite: TestSuite, defaults: TestDefaults, cache: LRUCache = None):
+    """Compile a cell, returning its model and a suite fragment holding its tests, keywords and variables.
 
-    return {"text/html": html}
+    Settings (imports, suite setup, test defaults...) are applied on the suite and defaults directly.
+    The fragment may be shared with the cache, use merge_fragment to add its content to the suite."""
+    curdir = os.getcwd().replace("\\", "\\\\")
 
+    key = None
+    cached = None
+    if cache is not None:
+        key = get_cache_key(code, suite, defaults, curdir)
+        cached = cache.get(key)
 
-def _execute_impl(code: str, suite: TestSuite, defaults: TestDefaults = TestDefaults(),
-                  stdout=None, stderr=None, listeners=[], drivers=[], outputdir=None, interactive_keywords=True, logger=None):
-    # This will help raise runtime exceptions
-    traceback = []
-    LOGGER.register_error_listener(lambda: traceback.extend(get_error_details()))
+    if cached is not None:
+        model, fragment = cached
+        SettingsBuilder(suite, defaults).visit(model)
+    else:
+        model = get_model(StringIO(code), data_only=False, curdir=curdir)
+        ErrorReporter(code).visit(model)
+        SettingsBuilder(suite, defaults).visit(model)
 
+        fragment = TestSuite(name=suite.name, source=suite.source)
+        SuiteBuilder(fragment, defaults).visit(model)
+
+        if cache is not None:
+            cache.put(key, (model, fragment))
+
+    return model, fragment
+
+
+def merge_fragment(suite: TestSuite, fragment: TestSuite, journal: ResourceJournal):
+    """Add copies of the fragment tests, keywords and variables to the suite.
+
+    Variables and keywords replace the already defined ones with the same name."""
+    for variable in fragment.resource.variables:
+        journal.insert("variables", copy(variable))
+    for keyword in fragment.resource.keywords:
+        journal.insert("keywords", copy(keyword))
+    suite.tests.extend([copy(item) for item in fragment.tests])
+
+
+def set_added_sources(suite: TestSuite, journal: ResourceJournal):
+    """Set the source of the items added to the suite resource, returning the added keywords."""
+    for new_import in journal.added("imports"):
+        new_import.source = suite.source
+    for new_variable in journal.added("variables"):
+        new_variable.source = suite.source
+    new_keywords = journal.added("keywords")
+    for new_keyword in new_keywords:
+        new_keyword.actual_source = suite.source
+    return new_keywords
+
+
+def _execute_impl(code: str, suite: TestSuite, defaults: TestDefaults = TestDefaults(),
+                  stdout=None, stderr=None, listeners=[], drivers=[], outputdir=None, interactive_keywords=True, logger=None,
+                  parse_cache=None, log_mode="inline", screenshot_options=None,
+                  artifact_store=None, background_report=False, cleanup=None, session_result=None, workers=None,
+                  execution_pool=None, with_report=True, metrics=None):
     # Clear selector completion highlights
-    for driver in yield_current_connection(drivers, SeleniumConnectionsListener.NAMES + ["jupyter"]):
-        try:
-            clear_selector_highlights(driver)
-        except BrokenOpenConnection:
-            close_current_connection(drivers, driver)
+    with timed(metrics, "highlights"):
+        for driver in yield_current_connection(drivers, SeleniumConnectionsListener.NAMES + ["jupyter"]):
+            try:
+                clear_selector_highlights(driver)
+            except BrokenOpenConnection:
+                close_current_connection(drivers, driver)
 
     if logger is not None:
         logger.debug("Compiling code: \n%s", code)
 
-    # Copy keywords/variables/libraries in case of failure
-    imports = get_items_copy(suite.resource.imports)
-    variables = get_items_copy(suite.resource.variables)
-    keywords = get_items_copy(suite.resource.keywords)
+    # Journal keywords/variables/libraries changes in case of failure
+    journal = ResourceJournal(suite.resource)
 
     # Compile AST
-    model = get_model(
-        StringIO(code),
-        data_only=False,
-        curdir=os.getcwd().replace("\\", "\\\\"),
-    )
-    ErrorReporter(code).visit(model)
-    SettingsBuilder(suite, defaults).visit(model)
-    SuiteBuilder(suite, defaults).visit(model)
+    with timed(metrics, "parse"):
+        model, fragment = build_cell(code, suite, defaults, parse_cache)
+    with timed(metrics, "merge"):
+        merge_fragment(suite, fragment, journal)
 
-    # Strip variables/keyword duplicates
-    strip_duplicate_items(suite.resource.variables)
-    strip_duplicate_items(suite.resource.keywords)
+    if logger is not None:
+        if parse_cache is not None:
+            logger.debug("Parse cache: %s", parse_cache.info())
+        logger.debug("Redefined variables: %s", journal.shadowed("variables"))
+        logger.debug("Redefined keywords: %s", journal.shadowed("keywords"))
 
     for listener in listeners:
         # Notify suite variables to the listener
         if isinstance(listener, GlobalVarsListener):
             listener.suite_vars = [var.name for var in suite.resource.variables]
 
-    new_imports = [item for item in get_items_copy(suite.resource.imports) if item not in imports]
-    for new_import in new_imports:
-        new_import.source = suite.source
-    new_variables = [item for item in get_items_copy(suite.resource.variables) if item not in variables]
-    for new_variable in new_variables:
-        new_variable.source = suite.source
     # If there is no test, allow the user to interact with defined keywords by providing widgets
-    new_keywords = [item for item in get_items_copy(suite.resource.keywords) if item not in keywords]
-    for new_keyword in new_keywords:
-        new_keyword.actual_source = suite.source
+    new_keywords = set_added_sources(suite, journal)
     if not suite.tests and new_keywords and interactive_keywords:
         return None, [
             get_interactive_keyword(
@@ -314,18 +609,38 @@ def _execute_impl(code: str, suite: TestSuite, defaults: TestDefaults = TestDefa
     if logger is not None:
         logger.debug("Executing code")
 
-    # Execute suite
-    result = suite.run(
-        outputdir=outputdir,
-        stdout=stdout, stderr=stderr,
-        listener=listeners
-    )
+    # Execute suite, collecting errors to help raise runtime exceptions
+    with ERROR_COLLECTOR.capture() as traceback, timed(metrics, "run"):
+        if execution_pool is not None or (workers is not None and workers > 1 and len(suite.tests) > 1):
+            if logger is not None:
+                logger.debug("Running %s tests in %s worker processes", len(suite.tests), workers or 1)
+                if listeners:
+                    logger.warning(
+                        "Listeners are not notified of the tests run in worker processes: %s",
+                        ", ".join(type(listener).__name__ for listener in listeners)
+                    )
+                if not isinstance(stdout, NoOpStream):
+                    logger.warning("The console output of the tests run in worker processes is not written to stdout")
+            if execution_pool is not None:
+                execution_pool.preload(get_library_names(suite))
+            try:
+                result = run_parallel(suite, outputdir, workers or 1, traceback, screenshot_options, execution_pool)
+            except WorkerError as e:
+                traceback.append(str(e))
+            else:
+                result.save(os.path.join(outputdir, "output.xml"))
+        else:
+            suite.run(
+                outputdir=outputdir, output="output.xml", log="NONE", report="NONE",
+                stdout=stdout, stderr=stderr,
+                listener=listeners if metrics is None else [TimedListener(listener, metrics) for listener in listeners]
+            )
+            # The result returned by suite.run has no keywords nor messages, the full one is read from output.xml
+            result = ExecutionResult(os.path.join(outputdir, "output.xml"))
 
     if len(traceback) != 0:
         # Reset keywords/variables/libraries
-        set_items(suite.resource.imports, imports)
-        set_items(suite.resource.variables, variables)
-        set_items(suite.resource.keywords, keywords)
+        journal.revert()
 
         clean_items(suite.tests)
 
@@ -343,9 +658,17 @@ def _execute_impl(code: str, suite: TestSuite, defaults: TestDefaults = TestDefa
     # Detect RPA
     suite.rpa = get_rpa_mode(model)
 
+    if session_result is not None and suite.tests:
+        with timed(metrics, "session"):
+            session_result.append(result, outputdir)
+
     report = None
-    if suite.tests:
-        report = generate_report(suite, outputdir)
+    if suite.tests and with_report:
+        with timed(metrics, "report"):
+            report = generate_report(
+                suite, outputdir, result, log_mode, screenshot_options, artifact_store=artifact_store,
+                background=background_report, cleanup=cleanup, metrics=metrics
+            )
 
     # Remove tests run so far,
     # this is needed so that we don't run them again in the next execution
@@ -355,160 +678,426 @@ def _execute_impl(code: str, suite: TestSuite, defaults: TestDefaults = TestDefa
 
 
 def execute(code: str, suite: TestSuite, defaults: TestDefaults = TestDefaults(),
-            stdout=None, stderr=None, listeners=[], drivers=[], outputdir=None, logger=None):
+            stdout=None, stderr=None, listeners=[], drivers=[], outputdir=None, logger=None,
+            parse_cache: LRUCache = PARSE_CACHE, log_mode: str = "inline",
+            screenshot_options: ScreenshotOptions = None, artifact_store: ArtifactStore = None,
+            background_report: bool = False, session_result: SessionResult = None, workers: int = None,
+            execution_pool: WorkerPool = None, metrics: PhaseMetrics = None):
     """
     Execute a snippet of code, given the current test suite. Returns a tuple containing the result of the
     suite (if there were tests) and a displayable object containing either the report or interactive widgets.
+    Unchanged cells are not parsed again if a parse cache is given, pass None to disable it.
+    With the "lazy" log mode, the report is a list of widgets showing the result summary and rendering the log
+    only on demand. With the "viewer" log mode, the log template is shipped once and each report only carries its
+    result data. With the "artifact" log mode, the execution outputs are kept in the artifact store (a default
+    one if not given) and the report references them, see open_artifact.
+    With background_report, the report is rendered in a worker thread: it is returned right away as an Output
+    widget showing a placeholder until the log is ready.
+    The result of each cell running tests is appended to the session result if given, see SessionResult.export.
+    With workers, the tests of the cell are partitioned across as many worker processes, each one running
+    them against a snapshot of the suite imports, variables and keywords. Listeners are not notified and nothing is
+    written to stdout then, which is logged as a warning.
+    With an execution pool, the cell is run this way in the pre-started worker processes of the pool, so that
+    a crashing, hanging or leaking cell does not affect the kernel.
+    The output.xml file of the cell is always written to the output directory, a temporary one being used if none
+    is given, and the result is read back from it: in Robot Framework 3 and 4 the result returned by a run has no
+    keywords nor messages. In the inline log mode, log.html is also written there.
+    Screenshots embedded in the log can be downscaled and re-encoded with the screenshot options.
+    If metrics are given, the wall and CPU times of the execution phases are added to them, logged and recorded
+    in the session metrics, see SESSION_METRICS.
     """
-    if outputdir is None:
-        with TemporaryDirectory() as path:
-            result = _execute_impl(code, suite, defaults, stdout, stderr, listeners, drivers, path, logger=logger)
-    else:
-        result = _execute_impl(code, suite, defaults, stdout, stderr, listeners, drivers, outputdir, logger=logger)
+    if log_mode not in LOG_MODES:
+        raise ValueError(f"Unknown log mode '{log_mode}', expected one of {', '.join(LOG_MODES)}")
+
+    with measure("execute", metrics, logger) as metrics:
+        if outputdir is None:
+            directory = TemporaryDirectory()
+            try:
+                result = _execute_impl(code, suite, defaults, stdout, stderr, listeners, drivers, directory.name,
+                                       logger=logger, parse_cache=parse_cache, log_mode=log_mode,
+                                       screenshot_options=screenshot_options, artifact_store=artifact_store,
+                                       background_report=background_report, cleanup=directory.cleanup,
+                                       session_result=session_result, workers=workers,
+                                       execution_pool=execution_pool, metrics=metrics)
+            except BaseException:
+                directory.cleanup()
+                raise
+            # A report rendered in the background removes the directory once done
+            if not background_report or result[1] is None or result[0] is None:
+                directory.cleanup()
+        else:
+            result = _execute_impl(code, suite, defaults, stdout, stderr, listeners, drivers, outputdir, logger=logger,
+                                   parse_cache=parse_cache, log_mode=log_mode,
+                                   screenshot_options=screenshot_options, artifact_store=artifact_store,
+                                   background_report=background_report, session_result=session_result,
+                                   workers=workers, execution_pool=execution_pool, metrics=metrics)
 
     return result
 
 
-def complete(code: str, cursor_pos: int, suite: TestSuite, keywords_listener: RobotKeywordsIndexerListener = None, extra_libraries: List[str] = [], drivers=[], logger=None):
-    """Complete a snippet of code, given the current test suite."""
-    context = detect_robot_context(code, cursor_pos)
-    cursor_pos = cursor_pos is None and len(code) or cursor_pos
-    line, offset = line_at_cursor(code, cursor_pos)
-    line_cursor = cursor_pos - offset
-    needle = re.split(r"\s{2,}|\t| \| ", line[:line_cursor])[-1].lstrip()
-
-    if logger is not None:
-        logger.debug("Completing text: %s", needle)
-
-    library_completion = context == "__settings__" and any(
-        [
-            line.lower().startswith("library "),
-            "import library " in line.lower(),
-            "reload library " in line.lower(),
-            "get library instance" in line.lower(),
-        ]
-    )
+def split_result(result, counts: List[int]):
+    """Split a result in consecutive results having the given numbers of tests, None for no test."""
+    tests = list(result.suite.tests)
+    results = []
+    start = 0
+    for count in counts:
+        if not count:
+            results.append(None)
+            continue
+        part = Result(
+            root_suite=ResultSuite(name=result.suite.name, doc=result.suite.doc, source=result.suite.source),
+            rpa=result.rpa
+        )
+        part.suite.tests = tests[start:start + count]
+        part.suite.starttime = tests[start].starttime
+        part.suite.endtime = tests[start + count - 1].endtime
+        results.append(part)
+        start += count
+    return results
 
-    matches = []
 
-    # Try to complete a variable
-    if needle and needle[0] in "$@&%":
-        if logger is not None:
-            logger.debug("Context: Variable")
-
-        potential_vars = list(set(
-            [var.name for var in suite.resource.variables] +
-            VARIABLE_REGEXP.findall(code) +
-            BUILTIN_VARIABLES
-        ))
-
-        matches = [
-            m["ref"]
-            for m in scored_results(needle, [dict(ref=v) for v in potential_vars])
-            if needle.lower() in m["ref"].lower()
-        ]
+def check_imports(suite: TestSuite, outputdir: str, stderr=None):
+    """Run a suite without its tests and fixtures, returning the errors raised by its imports and variables."""
+    tests = list(suite.tests)
+    clean_items(suite.tests)
+    if ROBOT_MAJOR_VERSION >= 4:
+        fixtures = suite.setup, suite.teardown
+        suite.setup, suite.teardown = None, None
+    else:
+        fixtures = list(suite.keywords)
+        clean_items(suite.keywords)
+    try:
+        with ERROR_COLLECTOR.capture() as errors:
+            suite.run(
+                outputdir=outputdir, output="NONE", log="NONE", report="NONE",
+                stdout=NoOpStream(), stderr=stderr
+            )
+        return list(errors)
+    finally:
+        suite.tests.extend(tests)
+        if ROBOT_MAJOR_VERSION >= 4:
+            suite.setup, suite.teardown = fixtures
+        else:
+            suite.keywords.extend(fixtures)
 
-        if len(line) > line_cursor and line[line_cursor] == "}":
-            cursor_pos += 1
-            needle += "}"
-    # Try to complete a library name
-    elif library_completion:
-        if logger is not None:
-            logger.debug("Context: Library name")
 
-        needle = needle.lower()
-        needle = remove_prefix(needle, 'library ')
-        needle = remove_prefix(needle, 'import library ')
-        needle = remove_prefix(needle, 'reload library ')
-        needle = remove_prefix(needle, 'get library instance ')
+def execute_many(cells: List[str], suite: TestSuite, defaults: TestDefaults = TestDefaults(),
+                 stdout=None, stderr=None, listeners=[], drivers=[], outputdir=None, logger=None,
+                 parse_cache: LRUCache = PARSE_CACHE):
+    """
+    Execute snippets of code in order, running the tests of all of them in a single Robot Framework execution,
+    e.g. to restore the state of a notebook. Returns a list with a (result, error) tuple per cell, the result
+    being None if the cell has no test and the error the exception raised by the cell if any.
+    Keywords and variables are defined before running any test: a keyword redefined by a cell is also the one
+    used by the tests of the previous cells. No report is generated.
+    The imports and variables of each cell are checked by a run without tests nor fixtures before the tests run,
+    a failing cell being left out as with execute. Tests are never run twice: errors still raised by the single
+    execution cannot be attributed to a cell, they are attached to every cell having tests along its result.
+    """
+    outcomes = [[None, None] for _ in cells]
+    counts = [0] * len(cells)
+    rpa = None
+    tests = []
+
+    directory = TemporaryDirectory() if outputdir is None else None
+    try:
+        journal = ResourceJournal(suite.resource)
+        for index, code in enumerate(cells):
+            try:
+                model, fragment = build_cell(code, suite, defaults, parse_cache)
+                cell_rpa = get_rpa_mode(model)
+            except DataError as e:
+                outcomes[index][1] = e
+                continue
+            merge_fragment(suite, fragment, journal)
+            set_added_sources(suite, journal)
+            cell_tests = list(suite.tests)
+            clean_items(suite.tests)
+
+            if journal.added("imports") or journal.added("variables"):
+                errors = check_imports(suite, outputdir or directory.name, stderr)
+                if errors:
+                    journal.revert()
+                    if logger is not None:
+                        logger.debug("Execution error in cell %s: %s", index, "\n".join(errors))
+                    outcomes[index][1] = TestSuiteError("\n".join(errors))
+                    continue
+            journal.commit()
+
+            tests.extend(cell_tests)
+            counts[index] = len(cell_tests)
+            if counts[index]:
+                rpa = cell_rpa
+
+        for listener in listeners:
+            if isinstance(listener, GlobalVarsListener):
+                listener.suite_vars = [var.name for var in suite.resource.variables]
 
-        matches = complete_libraries(needle, extra_libraries)
-    # Try to complete a CSS selector
-    elif is_selector(needle):
-        if logger is not None:
-            logger.debug("Context: Selenium or Appium selector")
-            logger.debug("Current WebDrivers: %s", drivers)
-
-        matches = []
-        for driver in yield_current_connection(drivers, SeleniumConnectionsListener.NAMES + ["jupyter", "appium"]):
-            matches = [get_selector_completions(needle.rstrip(), driver)[0]]
-    # Try to complete an AutoIt selector
-    elif is_autoit_selector(needle):
         if logger is not None:
-            logger.debug("Context: AutoIt selector")
+            logger.debug("Executing %s cells, %s tests", len(cells), len(tests))
 
-        matches = [get_autoit_selector_completions(needle)[0]]
-    # Try to complete a white selector
-    elif is_white_selector(needle):
-        if logger is not None:
-            logger.debug("Context: WhiteLibrary selector")
+        suite.tests.extend(tests)
+        try:
+            with ERROR_COLLECTOR.capture() as traceback:
+                suite.run(
+                    outputdir=outputdir or directory.name, output="output.xml", log="NONE", report="NONE",
+                    stdout=stdout or NoOpStream(), stderr=stderr, listener=listeners
+                )
+                result = ExecutionResult(os.path.join(outputdir or directory.name, "output.xml"))
+        finally:
+            clean_items(suite.tests)
+    finally:
+        if directory is not None:
+            directory.cleanup()
 
-        matches = [get_white_selector_completions(needle)[0]]
-    # Try to complete a Windows selector
-    elif is_win32_selector(needle):
-        if logger is not None:
-            logger.debug("Context: Win32 selector")
+    for listener in listeners:
+        if isinstance(listener, RobotKeywordsIndexerListener):
+            listener.import_from_suite_data(suite)
+    suite.rpa = rpa
 
-        matches = [get_win32_selector_completions(needle)[0]]
-    # Try to complete a keyword
-    elif keywords_listener is not None:
+    error = None
+    if len(traceback) != 0:
         if logger is not None:
-            logger.debug("Context: Keywords or Built-ins")
+            logger.debug("Batch execution error: %s", "\n".join(traceback))
+        error = TestSuiteError("\n".join(traceback))
+
+    for outcome, cell_result in zip(outcomes, split_result(result, counts)):
+        if cell_result is not None:
+            outcome[0] = cell_result
+            outcome[1] = error
+    return [tuple(outcome) for outcome in outcomes]
+
+
+def execute_each(cells: List[str], suite: TestSuite, defaults: TestDefaults = TestDefaults(),
+                 stdout=None, stderr=None, listeners=[], drivers=[], outputdir=None, logger=None,
+                 parse_cache: LRUCache = PARSE_CACHE):
+    """Execute snippets of code one by one, returning a (result, error) tuple per cell, see execute_many."""
+    outcomes = []
+    for code in cells:
+        directory = TemporaryDirectory() if outputdir is None else None
+        try:
+            result, _ = _execute_impl(
+                code, suite, defaults, stdout, stderr, listeners, drivers, outputdir or directory.name,
+                interactive_keywords=False, logger=logger, parse_cache=parse_cache, with_report=False
+            )
+            outcomes.append((result if result is not None and result.suite.tests else None, None))
+        except (DataError, TestSuiteError) as e:
+            outcomes.append((None, e))
+        finally:
+            if directory is not None:
+                directory.cleanup()
+    return outcomes
+
+
+# Cells executed asynchronously run one at a time, as Robot Framework executions share global state
+EXECUTION_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="robot-execution")
+
+
+class ExecutionHandle:
+    """Awaitable handle of a cell execution running in the background, see execute_async."""
+
+    def __init__(self, future, canceller: ExecutionCanceller):
+        self.future = future
+        self.canceller = canceller
+
+    def cancel(self, reason: str = "Execution cancelled"):
+        """Stop the execution after the current keyword."""
+        self.future.cancel()
+        self.canceller.cancel(reason)
+
+    @property
+    def cancelled(self):
+        return self.canceller.reason is not None
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """Wait for the (result, report) tuple of the execution."""
+        return self.future.result(timeout)
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+
+def _execute_cancellable(canceller, deadline, code, suite, **kwargs):
+    timer = None
+    if deadline is not None:
+        timer = Timer(deadline, canceller.cancel, [f"Execution deadline of {deadline}s exceeded"])
+        timer.daemon = True
+        timer.start()
+    try:
+        with canceller.armed(), thread_timeouts():
+            return execute(code, suite, **kwargs)
+    finally:
+        if timer is not None:
+            timer.cancel()
+
+
+def execute_async(code: str, suite: TestSuite, deadline: float = None,
+                  executor: ThreadPoolExecutor = EXECUTION_EXECUTOR, **kwargs):
+    """Execute a snippet of code on the execution thread, see execute for the arguments.
+
+    Returns an ExecutionHandle which can be awaited or cancelled, the execution being stopped after
+    the current keyword. The execution is also stopped once it has run for deadline seconds if given.
+    Test and keyword timeouts are raised from a timer thread, see thread_timeouts."""
+    canceller = ExecutionCanceller()
+    future = executor.submit(_execute_cancellable, canceller, deadline, code, suite, **kwargs)
+    return ExecutionHandle(future, canceller)
+
+
+def complete(code: str, cursor_pos: int, suite: TestSuite, keywords_listener: RobotKeywordsIndexerListener = None, extra_libraries: List[str] = [], drivers=[], logger=None, metrics: PhaseMetrics = None):
+    """Complete a snippet of code, given the current test suite.
+
+    The wall and CPU times of the completion phases are added to the given metrics."""
+    with measure("complete", metrics, logger) as metrics:
+        with timed(metrics, "context"):
+            context = detect_robot_context(code, cursor_pos)
+            cursor_pos = cursor_pos is None and len(code) or cursor_pos
+            line, offset = line_at_cursor(code, cursor_pos)
+            line_cursor = cursor_pos - offset
+            needle = re.split(r"\s{2,}|\t| \| ", line[:line_cursor])[-1].lstrip()
+
+            if logger is not None:
+                logger.debug("Completing text: %s", needle)
+
+            library_completion = context == "__settings__" and any(
+                [
+                    line.lower().startswith("library "),
+                    "import library " in line.lower(),
+                    "reload library " in line.lower(),
+                    "get library instance" in line.lower(),
+                ]
+            )
 
-        matches = get_lunr_completions(
-            needle,
-            keywords_listener.index,
-            keywords_listener.keywords,
-            context
-        )
+        with timed(metrics, "matches"):
+            matches = []
+
+            # Try to complete a variable
+            if needle and needle[0] in "$@&%":
+                if logger is not None:
+                    logger.debug("Context: Variable")
+
+                potential_vars = list(set(
+                    [var.name for var in suite.resource.variables] +
+                    VARIABLE_REGEXP.findall(code) +
+                    BUILTIN_VARIABLES
+                ))
+
+                matches = [
+                    m["ref"]
+                    for m in scored_results(needle, [dict(ref=v) for v in potential_vars])
+                    if needle.lower() in m["ref"].lower()
+                ]
+
+                if len(line) > line_cursor and line[line_cursor] == "}":
+                    cursor_pos += 1
+                    needle += "}"
+            # Try to complete a library name
+            elif library_completion:
+                if logger is not None:
+                    logger.debug("Context: Library name")
+
+                needle = needle.lower()
+                needle = remove_prefix(needle, 'library ')
+                needle = remove_prefix(needle, 'import library ')
+                needle = remove_prefix(needle, 'reload library ')
+                needle = remove_prefix(needle, 'get library instance ')
+
+                matches = complete_libraries(needle, extra_libraries)
+            # Try to complete a CSS selector
+            elif is_selector(needle):
+                if logger is not None:
+                    logger.debug("Context: Selenium or Appium selector")
+                    logger.debug("Current WebDrivers: %s", drivers)
+
+                matches = []
+                for driver in yield_current_connection(drivers, SeleniumConnectionsListener.NAMES + ["jupyter", "appium"]):
+                    matches = [get_selector_completions(needle.rstrip(), driver)[0]]
+            # Try to complete an AutoIt selector
+            elif is_autoit_selector(needle):
+                if logger is not None:
+                    logger.debug("Context: AutoIt selector")
+
+                matches = [get_autoit_selector_completions(needle)[0]]
+            # Try to complete a white selector
+            elif is_white_selector(needle):
+                if logger is not None:
+                    logger.debug("Context: WhiteLibrary selector")
+
+                matches = [get_white_selector_completions(needle)[0]]
+            # Try to complete a Windows selector
+            elif is_win32_selector(needle):
+                if logger is not None:
+                    logger.debug("Context: Win32 selector")
+
+                matches = [get_win32_selector_completions(needle)[0]]
+            # Try to complete a keyword
+            elif keywords_listener is not None:
+                if logger is not None:
+                    logger.debug("Context: Keywords or Built-ins")
+
+                matches = get_lunr_completions(
+                    needle,
+                    keywords_listener.index,
+                    keywords_listener.keywords,
+                    context
+                )
 
-    if logger is not None:
-        logger.debug("Available completions: %s", matches)
+        if logger is not None:
+            logger.debug("Available completions: %s", matches)
 
-    return {
-        "matches": matches,
-        "cursor_end": cursor_pos,
-        "cursor_start": cursor_pos - len(needle)
-    }
+        return {
+            "matches": matches,
+            "cursor_end": cursor_pos,
+            "cursor_start": cursor_pos - len(needle)
+        }
 
 
-def inspect(code: str, cursor_pos: int, suite: TestSuite, keywords_listener: RobotKeywordsIndexerListener = None, detail_level=0, logger=None):
-    cursor_pos = len(code) if cursor_pos is None else cursor_pos
-    line, offset = line_at_cursor(code, cursor_pos)
-    line_cursor = cursor_pos - offset
-    left_needle = re.split(r"\s{2,}|\t| \| ", line[:line_cursor])[-1]
-    right_needle = re.split(r"\s{2,}|\t| \| ", line[line_cursor:])[0]
-    needle = left_needle.lstrip().lower() + right_needle.rstrip().lower()
+def inspect(code: str, cursor_pos: int, suite: TestSuite, keywords_listener: RobotKeywordsIndexerListener = None, detail_level=0, logger=None, metrics: PhaseMetrics = None):
+    with measure("inspect", metrics, logger) as metrics:
+        cursor_pos = len(code) if cursor_pos is None else cursor_pos
+        line, offset = line_at_cursor(code, cursor_pos)
+        line_cursor = cursor_pos - offset
+        left_needle = re.split(r"\s{2,}|\t| \| ", line[:line_cursor])[-1]
+        right_needle = re.split(r"\s{2,}|\t| \| ", line[line_cursor:])[0]
+        needle = left_needle.lstrip().lower() + right_needle.rstrip().lower()
 
-    if logger is not None:
-        logger.debug("Inspecting text: %s", needle)
+        if logger is not None:
+            logger.debug("Inspecting text: %s", needle)
 
-    results = []
-    data = {}
-    found = False
+        with timed(metrics, "lookup"):
+            results = []
+            data = {}
+            found = False
 
-    if needle and lunr_query(needle):
-        query = lunr_query(needle)
-        results = keywords_listener.index.search(query)
-        results += keywords_listener.index.search(query.strip("*"))
+            # Look for a user keyword first, which is a direct lookup
+            keyword = get_resource_index(suite.resource).find("keywords", needle) if needle else None
+            if keyword is not None:
+                data = get_keyword_doc(keyword)
+                found = True
+            elif needle and lunr_query(needle):
+                query = lunr_query(needle)
+                results = keywords_listener.index.search(query)
+                results += keywords_listener.index.search(query.strip("*"))
 
-    for result in results:
-        keyword = keywords_listener.keywords[result["ref"]]
+            for result in results:
+                keyword = keywords_listener.keywords[result["ref"]]
 
-        if needle not in [keyword.name.lower(), result["ref"].lower()]:
-            continue
+                if needle not in [keyword.name.lower(), result["ref"].lower()]:
+                    continue
 
-        data = get_keyword_doc(keyword)
-        found = True
-        break
+                data = get_keyword_doc(keyword)
+                found = True
+                break
 
-    if logger is not None:
-        logger.debug("Inspection data: %s", data)
+        if logger is not None:
+            logger.debug("Inspection data: %s", data)
 
-    return {
-        "data": data,
-        "found": found,
-    }
+        return {
+            "data": data,
+            "found": found,
+        }
 
 
 def shutdown_drivers(drivers=[]):
@@ -517,29 +1106,11 @@ def shutdown_drivers(drivers=[]):
             driver["instance"].quit()
 
 
-def strip_duplicate_items(items: ItemList):
-    """Remove duplicates from an item list."""
-    new_items = {}
-    for item in items:
-        new_items[item.name] = item
-    items._items = list(new_items.values())
-
-
 def clean_items(items: ItemList):
     """Remove elements from an item list."""
     items._items = []
 
 
-def set_items(items: ItemList, value: List):
-    """Remove elements from an item list."""
-    items._items = value
-
-
-def get_items_copy(items: ItemList):
-    """Get copy of an itemlist."""
-    return list(items._items)
-
-
 def get_rpa_mode(model):
     """Get RPA mode for the test suite."""
     if not model:
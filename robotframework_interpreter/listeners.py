@@ -1,7 +1,9 @@
+from html import escape
 import inspect
 import json
 import logging
 import os
+import time
 import urllib.request
 
 from robot.errors import DataError
@@ -125,6 +127,10 @@ class StatusEventListener:
     def __init__(self, callback=None):
         self.callback = callback
 
+    def start_suite(self, name, attributes):
+        if self.callback is not None:
+            self.callback({"suite": name, "tests": attributes["tests"], "total": attributes["totaltests"]})
+
     def start_test(self, name, attributes):
         if self.callback is not None:
             self.callback({"test": name})
@@ -133,6 +139,106 @@ class StatusEventListener:
         if self.callback is not None:
             self.callback({"keyword": name})
 
+    def end_test(self, name, attributes):
+        if self.callback is not None:
+            self.callback({"test_result": {
+                "name": name,
+                "status": attributes["status"],
+                "elapsed": attributes["elapsedtime"] / 1000,
+                "message": attributes["message"],
+            }})
+
+
+class KeywordProfilerListener:
+    """Profile the keywords run, aggregating their calls, total and self times by library and keyword name.
+
+    The self time of a keyword excludes the time spent in the keywords it calls, control structures being
+    transparent. The total time of a recursive keyword only counts its outermost calls."""
+
+    ROBOT_LISTENER_API_VERSION = 2
+
+    KEYWORD_TYPES = ("keyword", "setup", "teardown")
+
+    columns = ["library", "keyword", "calls", "total", "self", "max"]
+
+    def __init__(self):
+        self.stats = {}
+        self._stack = []
+        self._active = {}
+
+    def start_keyword(self, name, attributes):
+        if attributes.get("type", "keyword").lower() not in self.KEYWORD_TYPES:
+            return
+        key = (attributes.get("libname", ""), attributes.get("kwname", name))
+        self._active[key] = self._active.get(key, 0) + 1
+        # Key, start time and time spent in child keywords
+        self._stack.append([key, time.perf_counter(), 0.])
+
+    def end_keyword(self, name, attributes):
+        if attributes.get("type", "keyword").lower() not in self.KEYWORD_TYPES or not self._stack:
+            return
+        key, start, children = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+        self._active[key] -= 1
+        stats = self.stats.setdefault(key, {"calls": 0, "total": 0., "self": 0., "max": 0.})
+        stats["calls"] += 1
+        stats["self"] += elapsed - children
+        stats["max"] = max(stats["max"], elapsed)
+        if not self._active[key]:
+            stats["total"] += elapsed
+
+    def end_suite(self, name, attributes):
+        # Keywords interrupted by a failed execution are dropped
+        self._stack.clear()
+        self._active.clear()
+
+    def reset(self):
+        self.stats.clear()
+        self.end_suite(None, {})
+
+    def top(self, n: int = 10, sort_by: str = "self", by_library: bool = False):
+        """Get the n hottest keywords, or libraries, as rows sorted by decreasing self or total time in seconds."""
+        if by_library:
+            stats = {}
+            for (library, _), keyword_stats in self.stats.items():
+                library_stats = stats.setdefault((library, ""), {"calls": 0, "total": 0., "self": 0., "max": 0.})
+                library_stats["calls"] += keyword_stats["calls"]
+                library_stats["self"] += keyword_stats["self"]
+                library_stats["max"] = max(library_stats["max"], keyword_stats["max"])
+                # Library keywords calling each other overlap, the total time of a library is its self time
+                library_stats["total"] = library_stats["self"]
+        else:
+            stats = self.stats
+
+        rows = [dict(library=library, keyword=keyword, **values) for (library, keyword), values in stats.items()]
+        return sorted(rows, key=lambda row: row[sort_by], reverse=True)[:n]
+
+    def get_mimebundle(self, n: int = 10, sort_by: str = "self", by_library: bool = False):
+        """Get the top n table as a text/html and text/plain mimebundle."""
+        rows = self.top(n, sort_by, by_library)
+        columns = [column for column in self.columns if not (by_library and column == "keyword")]
+
+        def cell(row, column):
+            return f"{row[column]:.3f}s" if isinstance(row[column], float) else str(row[column])
+
+        html = "<table><thead><tr>{}</tr></thead><tbody>{}</tbody></table>".format(
+            "".join(f"<th>{column}</th>" for column in columns),
+            "".join(
+                "<tr>{}</tr>".format("".join(f"<td>{escape(cell(row, column))}</td>" for column in columns))
+                for row in rows
+            )
+        )
+        text = "\n".join(
+            "\t".join(line) for line in [columns] + [[cell(row, column) for column in columns] for row in rows]
+        )
+        return {"text/html": html, "text/plain": text}
+
+    def _repr_mimebundle_(self, include=None, exclude=None):
+        return self.get_mimebundle()
+
 
 class ReturnValueListener:
     ROBOT_LISTENER_API_VERSION = 2
@@ -0,0 +1,188 @@
+"""Timing of the phases of cell executions, completions and inspections."""
+
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from html import escape
+from threading import Lock
+import time
+
+
+# CPU time of the current thread, the whole process one on platforms not providing it
+thread_time = getattr(time, "thread_time", time.process_time)
+
+# Upper bounds in seconds of the histogram buckets, from 0.1ms to about 14 minutes
+HISTOGRAM_BOUNDS = [0.0001 * 2 ** index for index in range(24)]
+
+
+class PhaseMetrics:
+    """Wall and CPU times, in seconds, of the phases of an operation.
+
+    A phase entered several times is accumulated. Phases can be nested, "total" covering the whole operation."""
+
+    def __init__(self, operation: str = None):
+        self.operation = operation
+        self.phases = OrderedDict()
+        self._lock = Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        wall, cpu = time.perf_counter(), thread_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, thread_time() - cpu)
+
+    def add(self, name: str, wall: float, cpu: float):
+        with self._lock:
+            previous_wall, previous_cpu = self.phases.get(name, (0., 0.))
+            self.phases[name] = (previous_wall + wall, previous_cpu + cpu)
+
+    def wall(self, name: str = "total"):
+        return self.phases.get(name, (0., 0.))[0]
+
+    def cpu(self, name: str = "total"):
+        return self.phases.get(name, (0., 0.))[1]
+
+    def as_dict(self):
+        return {name: {"wall": wall, "cpu": cpu} for name, (wall, cpu) in self.phases.items()}
+
+    def __str__(self):
+        return ", ".join(
+            f"{name}: {wall * 1000:.1f}ms ({cpu * 1000:.1f}ms CPU)" for name, (wall, cpu) in self.phases.items()
+        )
+
+
+class TimedListener:
+    """Listener proxy accumulating the time spent in the listener methods in the "listeners" phase."""
+
+    def __init__(self, listener, metrics: PhaseMetrics):
+        self._listener = listener
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attribute = getattr(self._listener, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        def method(*args, **kwargs):
+            with self._metrics.phase("listeners"):
+                return attribute(*args, **kwargs)
+
+        return method
+
+
+class Histogram:
+    """Counts of durations in exponentially growing buckets."""
+
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.
+        self.max = 0.
+
+    def add(self, value: float):
+        self.counts[bisect_left(HISTOGRAM_BOUNDS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0.
+
+    def quantile(self, q: float):
+        """Get an upper bound of the q-quantile, the upper bound of the bucket it falls in."""
+        if not self.count:
+            return 0.
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class SessionMetrics:
+    """Histograms of the wall and CPU times of the phases of all the operations recorded in a session."""
+
+    def __init__(self):
+        self.histograms = OrderedDict()
+        self._lock = Lock()
+
+    def record(self, metrics: PhaseMetrics):
+        with self._lock:
+            for name, (wall, cpu) in metrics.phases.items():
+                key = (metrics.operation, name)
+                if key not in self.histograms:
+                    self.histograms[key] = (Histogram(), Histogram())
+                self.histograms[key][0].add(wall)
+                self.histograms[key][1].add(cpu)
+
+    def summary(self):
+        """Get the count, mean, median, 95th percentile and maximum wall times and mean CPU time of each phase."""
+        with self._lock:
+            return [
+                {
+                    "operation": operation,
+                    "phase": name,
+                    "count": wall.count,
+                    "mean": wall.mean(),
+                    "p50": wall.quantile(0.5),
+                    "p95": wall.quantile(0.95),
+                    "max": wall.max,
+                    "cpu": cpu.mean(),
+                }
+                for (operation, name), (wall, cpu) in self.histograms.items()
+            ]
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def _repr_html_(self):
+        columns = ["operation", "phase", "count", "mean", "p50", "p95", "max", "cpu"]
+        rows = "".join(
+            "<tr>{}</tr>".format("".join(
+                f"<td>{row[column] * 1000:.1f}ms</td>" if isinstance(row[column], float)
+                else f"<td>{escape(str(row[column]))}</td>"
+                for column in columns
+            ))
+            for row in self.summary()
+        )
+        header = "".join(f"<th>{column}</th>" for column in columns)
+        return f"<table><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table>"
+
+
+SESSION_METRICS = SessionMetrics()
+
+
+@contextmanager
+def measure(operation: str, metrics: PhaseMetrics = None, logger=None):
+    """Time an operation as its "total" phase, yielding the given metrics to be filled with its phases.
+
+    Once done, the metrics are recorded in the session metrics and logged if a logger is given.
+    Nothing is timed nor recorded without metrics."""
+    if metrics is None:
+        yield None
+        return
+    if metrics.operation is None:
+        metrics.operation = operation
+
+    try:
+        with metrics.phase("total"):
+            yield metrics
+    finally:
+        SESSION_METRICS.record(metrics)
+        if logger is not None:
+            logger.debug("Timing of %s: %s", operation, metrics)
+
+
+@contextmanager
+def timed(metrics: PhaseMetrics, name: str):
+    """Time a phase if metrics are given."""
+    if metrics is None:
+        yield
+    else:
+        with metrics.phase(name):
+            yield
@@ -0,0 +1,360 @@
+"""Parallel execution of the test cases of a cell in worker processes."""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import importlib
+from io import BytesIO, StringIO
+import multiprocessing
+import os
+import pickle
+from queue import Queue
+import sys
+
+from robot.api import ExecutionResult
+from robot.running.model import TestSuite
+
+from .errors import ERROR_COLLECTOR
+from .robot_version import ROBOT_MAJOR_VERSION
+from .utils import ScreenshotOptions, process_result_screenshots
+
+
+SUITE_REFERENCE = "suite"
+
+PRELOAD_TASK = "preload"
+
+
+class WorkerError(Exception):
+    """A worker process died or timed out."""
+
+
+class SuitePickler(pickle.Pickler):
+    """Pickler replacing the references to suites, which are not picklable, by a placeholder.
+
+    Besides the suite itself, items parsed in a cell may still reference the suite they were built in."""
+
+    def persistent_id(self, obj):
+        return SUITE_REFERENCE if isinstance(obj, TestSuite) else None
+
+
+class SuiteUnpickler(pickle.Unpickler):
+    """Unpickler resolving the suite placeholder to the suite the snapshot is loaded in."""
+
+    def __init__(self, file, suite):
+        super(SuiteUnpickler, self).__init__(file)
+        self.suite = suite
+
+    def persistent_load(self, pid):
+        return self.suite
+
+
+def get_snapshot(suite: TestSuite, tests):
+    """Get a picklable snapshot of the suite imports, variables, keywords and fixtures, with the given tests."""
+    fp = BytesIO()
+    fixtures = (suite.setup, suite.teardown) if ROBOT_MAJOR_VERSION >= 4 else list(suite.keywords)
+    SuitePickler(fp).dump((suite.resource, fixtures, list(tests)))
+
+    return {
+        "name": suite.name,
+        "doc": suite.doc,
+        "metadata": dict(suite.metadata),
+        "source": suite.source,
+        "rpa": suite.rpa,
+        "data": fp.getvalue(),
+    }
+
+
+def load_snapshot(snapshot):
+    """Get the suite of a snapshot."""
+    suite = TestSuite(
+        name=snapshot["name"], doc=snapshot["doc"], metadata=snapshot["metadata"],
+        source=snapshot["source"], rpa=snapshot["rpa"]
+    )
+    resource, fixtures, tests = SuiteUnpickler(BytesIO(snapshot["data"]), suite).load()
+
+    suite.resource = resource
+    if ROBOT_MAJOR_VERSION >= 4:
+        suite.setup, suite.teardown = fixtures
+    else:
+        suite.keywords.extend(fixtures)
+    suite.tests.extend(tests)
+    return suite
+
+
+def run_partition(snapshot, outputdir: str):
+    """Run the suite of a snapshot, returning the path of its output.xml and the errors raised."""
+    suite = load_snapshot(snapshot)
+    os.makedirs(outputdir, exist_ok=True)
+
+    with ERROR_COLLECTOR.capture() as errors:
+        suite.run(
+            outputdir=outputdir, output="output.xml", log="NONE", report="NONE",
+            stdout=StringIO(), stderr=StringIO()
+        )
+
+    return os.path.join(outputdir, "output.xml"), list(errors)
+
+
+def get_library_names(suite: TestSuite):
+    """Get the names of the libraries imported in a suite."""
+    return [item.name for item in suite.resource.imports if item.type.upper() == "LIBRARY"]
+
+
+def partition(items, count: int):
+    """Split items in count round-robin partitions, as (indexes, items) tuples, dropping empty ones."""
+    partitions = [(list(range(index, len(items), count)), items[index::count]) for index in range(count)]
+    return [part for part in partitions if part[0]]
+
+
+def get_context():
+    """Get the multiprocessing context of the worker processes."""
+    # Forking a kernel running threads is unsafe, workers are spawned
+    return multiprocessing.get_context("spawn")
+
+
+def get_process_pool(workers: int):
+    return ProcessPoolExecutor(workers, mp_context=get_context())
+
+
+def run_parallel(suite: TestSuite, outputdir: str, workers: int, errors: list = None,
+                 screenshot_options: ScreenshotOptions = None, executor=None):
+    """Run the tests of a suite in workers processes, returning the merged result.
+
+    Each worker gets a snapshot of the suite resource and runs a partition of the tests, suite setup and
+    teardown included, in a subdirectory of the output directory. Screenshots are embedded in the result.
+    The errors raised in the workers are added to the given errors list."""
+    tests = list(suite.tests)
+    # A suite without tests is still run, for its imports and fixtures
+    partitions = partition(tests, workers) or [([], [])]
+
+    pool = executor or get_process_pool(len(partitions))
+    try:
+        futures = [
+            pool.submit(run_partition, get_snapshot(suite, part), os.path.join(outputdir, f"worker-{index}"))
+            for index, (_, part) in enumerate(partitions)
+        ]
+        outputs = [future.result() for future in futures]
+    finally:
+        if executor is None:
+            pool.shutdown()
+
+    results = []
+    for (path, worker_errors), (indexes, _) in zip(outputs, partitions):
+        result = ExecutionResult(path)
+        process_result_screenshots(result, os.path.dirname(path), screenshot_options)
+        results.append((indexes, result))
+        if errors is not None:
+            errors.extend(worker_errors)
+
+    return merge_results(results)
+
+
+def merge_results(results):
+    """Merge the (indexes, result) of partitions in one result, tests being sorted back by index."""
+    merged = results[0][1]
+    ordered = sorted(
+        (index, test)
+        for indexes, result in results
+        for index, test in zip(indexes, result.suite.tests)
+    )
+    merged.suite.tests = [test for _, test in ordered]
+
+    for _, result in results[1:]:
+        merged.errors.messages.extend(result.errors.messages)
+        if result.suite.starttime and result.suite.starttime < (merged.suite.starttime or "~"):
+            merged.suite.starttime = result.suite.starttime
+        if result.suite.endtime and result.suite.endtime > (merged.suite.endtime or ""):
+            merged.suite.endtime = result.suite.endtime
+
+    return merged
+
+
+def get_memory_usage():
+    """Get the resident memory of the current process in bytes, None if unknown."""
+    try:
+        with open("/proc/self/statm") as fp:
+            return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak memory usage, in kilobytes on Linux and bytes on macOS
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def preload_libraries(names):
+    """Import the modules of the given libraries, ignoring the ones which cannot be imported."""
+    for name in names:
+        for module in (f"robot.libraries.{name}", name):
+            try:
+                importlib.import_module(module)
+                break
+            except Exception:
+                continue
+
+
+def worker_main(conn, libraries, max_tasks, max_memory):
+    """Main loop of a worker process: run the (function, args) tasks received until asked to stop or recycled."""
+    import robot.running  # noqa: F401
+    preload_libraries(libraries)
+    conn.send("ready")
+
+    tasks = 0
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+
+        function, args = task
+        # Preloading libraries does not count as a task
+        if function == PRELOAD_TASK:
+            preload_libraries(args)
+            conn.send("ready")
+            continue
+
+        try:
+            response = (True, function(*args))
+        except Exception as e:
+            response = (False, e)
+
+        tasks += 1
+        memory = get_memory_usage() if max_memory is not None else None
+        recycle = (max_tasks is not None and tasks >= max_tasks) or (memory is not None and memory > max_memory)
+        try:
+            conn.send((response, recycle))
+        except Exception as e:
+            conn.send(((False, WorkerError(f"Cannot send the task result: {e}")), recycle))
+        if recycle:
+            return
+
+
+class Worker:
+    """A worker process and the connection to it."""
+
+    def __init__(self, context, libraries, max_tasks, max_memory):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=worker_main, args=(child, sorted(libraries), max_tasks, max_memory), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.ready = False
+        self.libraries = set(libraries)
+
+    def wait_ready(self):
+        """Wait for the worker to be done with its imports."""
+        if not self.ready:
+            self.conn.recv()
+            self.ready = True
+
+    def preload(self, libraries):
+        """Import the given libraries, if not already imported, and wait for the worker to be done."""
+        missing = set(libraries) - self.libraries
+        if missing:
+            self.conn.send((PRELOAD_TASK, sorted(missing)))
+            self.conn.recv()
+            self.libraries.update(missing)
+
+    def stop(self, timeout: float = 5):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """A pool of spawned worker processes, started ahead of the tasks with Robot Framework and libraries imported.
+
+    It can be used as the executor of run_parallel. Workers are replaced by fresh ones after running
+    max_tasks tasks or once using more than max_memory bytes, and when they die or run a task for more
+    than timeout seconds: the task then raises a WorkerError."""
+
+    def __init__(self, size: int = 2, max_tasks: int = 50, max_memory: int = None, timeout: float = None,
+                 libraries=()):
+        self.size = size
+        self.max_tasks = max_tasks
+        self.max_memory = max_memory
+        self.timeout = timeout
+        self.libraries = set(libraries)
+
+        self._context = get_context()
+        self._idle = Queue()
+        self._dispatchers = ThreadPoolExecutor(size, thread_name_prefix="robot-worker")
+        for _ in range(size):
+            self._idle.put(self._start_worker())
+
+    def _start_worker(self):
+        return Worker(self._context, self.libraries, self.max_tasks, self.max_memory)
+
+    def preload(self, libraries):
+        """Import the given libraries in the workers, in the idle ones right away and in the busy ones before
+        their next task."""
+        missing = set(libraries) - self.libraries
+        if not missing:
+            return
+        # Replaced rather than updated as the dispatcher threads read it
+        self.libraries = self.libraries | missing
+        for _ in range(self.size):
+            self._dispatchers.submit(self._run, None, ())
+
+    def submit(self, function, *args):
+        """Run a picklable function in a worker, returning a future of its result."""
+        return self._dispatchers.submit(self._run, function, args)
+
+    def _run(self, function, args):
+        """Run a task in an idle worker, only preparing it if function is None."""
+        worker = self._idle.get()
+        try:
+            worker.wait_ready()
+            worker.preload(self.libraries)
+            if function is None:
+                return None
+            worker.conn.send((function, args))
+            if not worker.conn.poll(self.timeout):
+                worker.kill()
+                worker = self._start_worker()
+                raise WorkerError(f"The worker process timed out after {self.timeout}s and was restarted")
+            (success, value), recycle = worker.conn.recv()
+            if recycle:
+                worker = self._replace(worker)
+        except (EOFError, OSError):
+            worker.kill()
+            worker = self._start_worker()
+            raise WorkerError("The worker process died and was restarted")
+        finally:
+            self._idle.put(worker)
+
+        if not success:
+            raise value
+        return value
+
+    def _replace(self, worker):
+        # The recycled worker exits by itself, it is replaced before the next task
+        replacement = self._start_worker()
+        worker.process.join()
+        worker.conn.close()
+        return replacement
+
+    def shutdown(self):
+        self._dispatchers.shutdown()
+        while not self._idle.empty():
+            self._idle.get().stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,404 @@
+"""Functions for rendering the result of an execution."""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import deepcopy
+from functools import lru_cache, partial
+from hashlib import sha1
+from html import escape
+from io import StringIO
+import os
+import shutil
+from tempfile import mkdtemp
+from threading import Lock
+
+from IPython.core.display import HTML as DisplayHTML, display
+from IPython.core.interactiveshell import InteractiveShell
+
+from robot.conf import RebotSettings
+from robot.htmldata import HtmlFileWriter, ModelWriter, LOG
+from robot.reporting.jswriter import JsResultWriter
+from robot.reporting.logreportwriters import LogWriter
+from robot.reporting.resultwriter import Results
+from robot.running.model import TestSuite
+
+from ipywidgets import VBox, HBox, Button, Output, HTML
+
+from .artifacts import ArtifactStore, get_artifact_store
+from .metrics import PhaseMetrics, timed
+from .robot_version import ROBOT_MAJOR_VERSION
+from .utils import (
+    ScreenshotOptions, copy_output, display_log, display_log_model, embed_log_template,
+    process_screenshots, process_result_screenshots
+)
+
+
+LOG_MODES = ("inline", "lazy", "viewer", "artifact")
+
+LOG_MODEL_PLACEHOLDER = "<!-- JS MODEL -->"
+
+# Reports generated in the background are rendered one at a time, in execution order
+REPORT_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="robot-report")
+
+# Logs bigger than this once compressed are not inlined in the cell output
+MAX_INLINE_LOG_SIZE = 10 * 1024 * 1024
+
+
+def write_log(outputdir: str, result=None, rpa=False, screenshot_options: ScreenshotOptions = None,
+              metrics: PhaseMetrics = None):
+    """Write log.html to the output directory, from the in-memory result if given or from the output.xml file.
+
+    Screenshots are embedded in the log, the messages of an in-memory result being restored afterwards."""
+    if result is None:
+        with timed(metrics, "screenshots"):
+            process_screenshots(outputdir, screenshot_options)
+        with timed(metrics, "log"):
+            write_result_log(os.path.join(outputdir, "output.xml"), os.path.join(outputdir, "log.html"), rpa)
+        return
+
+    with embedded_screenshots(result, outputdir, screenshot_options, metrics), timed(metrics, "log"):
+        write_result_log(result, os.path.join(outputdir, "log.html"), rpa)
+
+
+@contextmanager
+def embedded_screenshots(result, outputdir: str, screenshot_options: ScreenshotOptions = None,
+                         metrics: PhaseMetrics = None):
+    """Embed the screenshots in the messages of an in-memory result while in the block, restoring them afterwards."""
+    with timed(metrics, "screenshots"):
+        originals = process_result_screenshots(result, outputdir, screenshot_options)
+    try:
+        yield
+    finally:
+        for msg, message in originals:
+            msg.message = message
+
+
+def write_result_log(source, path: str, rpa=False):
+    """Write the log of an in-memory result or output.xml file."""
+    # The log writer is used directly as the ResultWriter notifies the global Robot Framework logger,
+    # which another execution may be using in the meantime when the report is generated in the background
+    settings = RebotSettings(log=path, report=None, rpa=rpa)
+    js_result = Results(settings, source).js_result
+    LogWriter(js_result).write(settings.log, dict(settings.log_config, minLevel=js_result.min_level))
+
+
+def read_log(outputdir: str):
+    """Read the log.html of the output directory."""
+    with open(os.path.join(outputdir, "log.html"), "rb") as fp:
+        log = fp.read()
+        log = log.replace(b'"reportURL":"report.html"', b'"reportURL":null')
+
+    return log
+
+
+class PlaceholderModelWriter(ModelWriter):
+    """Write a placeholder, filled client-side, instead of the result model."""
+
+    def __init__(self, output):
+        self._output = output
+
+    def write(self, line):
+        self._output.write(LOG_MODEL_PLACEHOLDER + "\n")
+
+
+@lru_cache(maxsize=None)
+def get_log_template():
+    """Get the log.html template, with a placeholder instead of the result model, and its id."""
+    output = StringIO()
+    HtmlFileWriter(output, PlaceholderModelWriter(output)).write(LOG)
+    template = output.getvalue()
+    return template, "robot-log-template-" + sha1(template.encode("utf-8")).hexdigest()[:12]
+
+
+def get_log_model(result, outputdir: str, rpa=False, screenshot_options: ScreenshotOptions = None,
+                  metrics: PhaseMetrics = None):
+    """Get the JavaScript result model filling the log.html template."""
+    with embedded_screenshots(result, outputdir, screenshot_options, metrics), timed(metrics, "log"):
+        settings = RebotSettings(log=os.path.join(outputdir, "log.html"), report=None, rpa=rpa)
+        js_result = Results(settings, result).js_result
+        config = dict(settings.log_config, minLevel=js_result.min_level)
+
+        output = StringIO()
+        JsResultWriter(output).write(js_result, config)
+        return output.getvalue()
+
+
+# Output directories retained by lazy logs, the oldest ones being removed beyond the maximum
+MAX_RETAINED_OUTPUTS = 20
+_retained_outputs = []
+_retained_outputs_lock = Lock()
+
+# Ids of the log templates already shipped to the frontend
+_shipped_log_templates = set()
+
+
+def reset_log_viewer():
+    """Ship the log template again with the next report.
+
+    The template is kept by the browser once rendered, this is only needed if the output shipping it was
+    never rendered in the current browser, e.g. when opening the notebook elsewhere."""
+    _shipped_log_templates.clear()
+
+
+def iter_tests(suite):
+    """Iterate over the tests of a result suite and its child suites."""
+    yield from suite.tests
+    for child in suite.suites:
+        yield from iter_tests(child)
+
+
+def get_statistics(result):
+    """Get the (passed, failed, skipped) test counts of a result."""
+    total = result.statistics.total
+    if ROBOT_MAJOR_VERSION == 4:
+        return total.passed, total.failed, total.skipped
+    return total.critical.passed, total.critical.failed, 0
+
+
+def get_summary_html(result):
+    """Get a compact HTML summary of a result: test counts and failure messages."""
+    passed, failed, skipped = get_statistics(result)
+    counts = [f"{passed} passed", f"{failed} failed"]
+    if skipped:
+        counts.append(f"{skipped} skipped")
+    color = "var(--jp-error-color1, red)" if failed else "var(--jp-success-color1, green)"
+
+    failures = "".join(
+        f"<li><strong>{escape(test.name)}</strong>: {escape(test.message)}</li>"
+        for test in iter_tests(result.suite)
+        if test.status == "FAIL"
+    )
+
+    return (
+        f'<span style="color:{color};padding-left:1ex;">{", ".join(counts)}</span>' +
+        (f'<ul style="margin:0;">{failures}</ul>' if failures else "")
+    )
+
+
+def get_log_button(script: str):
+    """Get the HTML of a Log button running the given script."""
+    return """
+        <button
+          class="jp-mod-styled jp-mod-accept"
+          onClick="{};event.preventDefault();event.stopPropagation();"
+        >
+            <i class="fa fa-file" aria-hidden="true"></i>
+            Log
+        </button>
+        """.format(script)
+
+
+def on_log_click(outputdir, rpa, screenshot_options, out, button, *args, **kwargs):
+    with out:
+        if not os.path.isdir(outputdir):
+            out.clear_output(wait=True)
+            display(DisplayHTML("<em>The output of this execution was removed, execute the cell again.</em>"))
+            return
+
+        if not os.path.exists(os.path.join(outputdir, "log.html")):
+            description = button.description
+            button.description = "Rendering..."
+            button.disabled = True
+            try:
+                write_log(outputdir, rpa=rpa, screenshot_options=screenshot_options)
+            finally:
+                button.description = description
+                button.disabled = False
+
+        out.clear_output(wait=True)
+        display(DisplayHTML(get_log_button(display_log(read_log(outputdir), "log.html"))))
+
+
+class ReleasingVBox(VBox):
+    """A box calling release once closed."""
+
+    def __init__(self, children, release):
+        super(ReleasingVBox, self).__init__(children)
+        self._release = release
+
+    def close(self):
+        try:
+            super(ReleasingVBox, self).close()
+        finally:
+            self._release()
+
+
+def get_log_widget(result, retained: str, rpa=False, screenshot_options: ScreenshotOptions = None, caption="",
+                   release=None):
+    """Get a widget showing the result summary, rendering the log of the retained directory on demand.
+
+    release is called once the widget is closed, if given."""
+    out = Output()
+    button = Button(description="Log", icon="file")
+    button.on_click(partial(on_log_click, retained, rpa, screenshot_options, out, button))
+
+    children = (HBox((button, HTML(get_summary_html(result) + caption))), out)
+    return VBox(children) if release is None else ReleasingVBox(children, release)
+
+
+def release_output(retained: str):
+    """Remove a retained output directory."""
+    with _retained_outputs_lock:
+        if retained in _retained_outputs:
+            _retained_outputs.remove(retained)
+    shutil.rmtree(os.path.dirname(retained), ignore_errors=True)
+
+
+def retain_output(outputdir: str, result):
+    """Copy the result, saved as output.xml, and its screenshots to a retained directory.
+
+    The oldest retained directories are removed beyond MAX_RETAINED_OUTPUTS."""
+    retained = os.path.join(mkdtemp(prefix="robot-output-"), "output")
+    copy_output(outputdir, retained, result)
+
+    with _retained_outputs_lock:
+        _retained_outputs.append(retained)
+        released = _retained_outputs[:-MAX_RETAINED_OUTPUTS]
+    for path in released:
+        release_output(path)
+
+    return retained
+
+
+def get_lazy_log(result, outputdir: str, rpa=False, screenshot_options: ScreenshotOptions = None):
+    """Get a widget showing the result summary, rendering the log only when the Log button is clicked.
+
+    The result and its screenshots are retained until the widget is closed, or until it is one of the
+    MAX_RETAINED_OUTPUTS most recent ones no more."""
+    retained = retain_output(outputdir, result)
+    return get_log_widget(result, retained, rpa, screenshot_options, release=partial(release_output, retained))
+
+
+def get_artifact_log(result, outputdir: str, rpa=False, screenshot_options: ScreenshotOptions = None,
+                     store: ArtifactStore = None):
+    """Get a widget showing the result summary and the key of the artifact the execution outputs are stored as.
+
+    The log is rendered in the artifact directory when the Log button is clicked."""
+    if store is None:
+        store = get_artifact_store()
+    key = store.put(outputdir, result)
+    caption = f'<div style="padding-left:1ex;opacity:0.7;">Artifact <code>{key}</code></div>'
+
+    return get_log_widget(result, store.path(key), rpa, screenshot_options, caption)
+
+
+def open_artifact(key: str, store: ArtifactStore = None, rpa=None, screenshot_options: ScreenshotOptions = None):
+    """Get the displayable log of a stored artifact, rendering it if needed."""
+    if store is None:
+        store = get_artifact_store()
+    path = store.get(key)
+    if path is None:
+        raise KeyError(f"Artifact {key} does not exist or was evicted")
+
+    if not os.path.exists(os.path.join(path, "log.html")):
+        write_log(path, rpa=rpa, screenshot_options=screenshot_options)
+        store.refresh(key)
+
+    return DisplayHTML(get_log_button(display_log(read_log(path), "log.html")))
+
+
+def get_display_data(report, format=None):
+    """Get the Output widget outputs displaying a report mimebundle or list of widgets."""
+    if isinstance(report, dict):
+        bundles = [(report, {})]
+    else:
+        format = format or InteractiveShell.instance().display_formatter.format
+        bundles = [format(widget) for widget in report]
+    return tuple(
+        {"output_type": "display_data", "data": data, "metadata": metadata}
+        for data, metadata in bundles
+    )
+
+
+def render_in_background(out, render, cleanup, format):
+    try:
+        report = render()
+        out.outputs = get_display_data(report, format)
+        return report
+    except Exception as e:
+        out.outputs = get_display_data({
+            "text/html": f'<pre style="color:var(--jp-error-color1, red);">Log generation failed: {escape(str(e))}</pre>'
+        })
+        raise
+    finally:
+        if cleanup is not None:
+            cleanup()
+
+
+def get_background_report(render, cleanup=None, executor: ThreadPoolExecutor = REPORT_EXECUTOR):
+    """Get an Output widget showing a placeholder until the report is rendered in the background.
+
+    The future of the report is available as the future attribute of the widget, cleanup is called once done."""
+    out = Output()
+    out.outputs = get_display_data({"text/html": "<em>Generating log...</em>"})
+    # The IPython shell must not be created from the worker thread
+    format = InteractiveShell.instance().display_formatter.format
+
+    out.future = executor.submit(render_in_background, out, render, cleanup, format)
+
+    return out
+
+
+def generate_report(suite: TestSuite, outputdir: str, result=None, log_mode: str = "inline",
+                    screenshot_options: ScreenshotOptions = None, max_inline_size: int = MAX_INLINE_LOG_SIZE,
+                    artifact_store: ArtifactStore = None, background=False, cleanup=None,
+                    metrics: PhaseMetrics = None):
+    """Generate the displayable report of an execution.
+
+    In background, a list containing an Output widget updated with the report once rendered is returned
+    right away. The output directory must then be kept until cleanup is called.
+
+    In "inline" mode the log is rendered right away and inlined, compressed, in a Log button mimebundle.
+    In "viewer" mode only the result model is inlined, the log template being shipped to the frontend
+    once per session and filled client-side.
+    In "lazy" mode, or if the compressed log is bigger than max_inline_size, a list of widgets showing the
+    result summary is returned instead.
+    In "artifact" mode, the execution outputs are kept in the artifact store and the widgets reference them.
+
+    The screenshots embedding and log rendering times are added to the metrics if given, unless in background.
+    The result is left as is."""
+    # Screenshots are embedded in the result while the log is rendered, the result is copied before being
+    # handed to the report thread as the caller may use it in the meantime
+    if background and result is not None and log_mode in ("inline", "viewer"):
+        result = deepcopy(result)
+
+    render = partial(
+        render_report, outputdir, result, getattr(suite, "rpa", False), log_mode,
+        screenshot_options, max_inline_size, artifact_store
+    )
+
+    if background:
+        return [get_background_report(render, cleanup)]
+
+    return render(metrics=metrics)
+
+
+def render_report(outputdir: str, result=None, rpa=False, log_mode: str = "inline",
+                  screenshot_options: ScreenshotOptions = None, max_inline_size: int = MAX_INLINE_LOG_SIZE,
+                  artifact_store: ArtifactStore = None, metrics: PhaseMetrics = None):
+    """Render the report of an execution, see generate_report."""
+    if log_mode == "lazy":
+        return [get_lazy_log(result, outputdir, rpa, screenshot_options)]
+    if log_mode == "artifact":
+        return [get_artifact_log(result, outputdir, rpa, screenshot_options, artifact_store)]
+
+    template = ""
+    if log_mode == "viewer":
+        log_template, template_id = get_log_template()
+        model = get_log_model(result, outputdir, rpa, screenshot_options, metrics)
+        script = display_log_model(model, template_id, LOG_MODEL_PLACEHOLDER, "log.html")
+        if template_id not in _shipped_log_templates:
+            template = embed_log_template(log_template, template_id)
+    else:
+        write_log(outputdir, result, rpa, screenshot_options, metrics)
+        script = display_log(read_log(outputdir), "log.html")
+
+    if len(script) > max_inline_size:
+        return [get_lazy_log(result, outputdir, rpa, screenshot_options)]
+
+    html = get_log_button(script)
+
+    if template:
+        _shipped_log_templates.add(template_id)
+
+    return {"text/html": template + html}
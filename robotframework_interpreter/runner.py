@@ -0,0 +1,167 @@
+"""Headless runner executing Robot Framework notebooks without a Jupyter kernel."""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import os
+import sys
+
+from robot.reporting.xunitwriter import XUnitWriter
+
+from .interpreter import init_suite, execute_each, execute_many
+from .parallel import get_context
+from .report import get_statistics
+from .robot_version import ROBOT_MAJOR_VERSION
+from .session import SessionResult
+
+
+def find_notebooks(paths):
+    """Get the notebooks of the given files and directories, directories being searched recursively."""
+    notebooks = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, filenames in os.walk(path):
+                dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+                notebooks.extend(
+                    os.path.join(root, filename) for filename in sorted(filenames) if filename.endswith(".ipynb")
+                )
+        else:
+            notebooks.append(path)
+    return notebooks
+
+
+def read_cells(path: str):
+    """Get the source of the code cells of a notebook."""
+    with open(path, encoding="utf-8") as fp:
+        notebook = json.load(fp)
+    cells = []
+    for cell in notebook.get("cells", []):
+        if cell.get("cell_type") != "code":
+            continue
+        source = cell.get("source", "")
+        cells.append("".join(source) if isinstance(source, list) else source)
+    return cells
+
+
+def get_outputdirs(notebooks, outputdir: str):
+    """Get the output directories of notebooks, following their layout relatively to their common directory."""
+    paths = [os.path.splitext(os.path.abspath(path))[0] for path in notebooks]
+    root = os.path.commonpath([os.path.dirname(path) for path in paths])
+    return [os.path.join(outputdir, os.path.relpath(path, root)) for path in paths]
+
+
+def run_notebook(path: str, outputdir: str, batch: bool = False):
+    """Execute the cells of a notebook from its directory, writing its output.xml and xunit.xml files.
+
+    Cells are executed one by one, as in the notebook. With batch, the tests of all the cells are run in a
+    single Robot Framework execution, see execute_many: this is faster, but all the keywords and variables
+    are defined before any test runs, so a test uses the last definition of a keyword redefined by a later cell.
+    Returns a summary of the execution."""
+    path = os.path.abspath(path)
+    outputdir = os.path.abspath(outputdir)
+    os.makedirs(outputdir, exist_ok=True)
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    suite = init_suite(name, os.path.dirname(path))
+    session = SessionResult(name)
+
+    cwd = os.getcwd()
+    os.chdir(os.path.dirname(path))
+    try:
+        execute_cells = execute_many if batch else execute_each
+        outcomes = execute_cells(read_cells(path), suite, outputdir=outputdir)
+    finally:
+        os.chdir(cwd)
+
+    errors = []
+    for index, (result, error) in enumerate(outcomes, start=1):
+        if error is not None:
+            errors.append(f"Cell {index}: {error}")
+        if result is not None:
+            session.append(result, name=f"Cell {index}")
+
+    output = os.path.join(outputdir, "output.xml")
+    xunit = os.path.join(outputdir, "xunit.xml")
+    session.save(output)
+    if ROBOT_MAJOR_VERSION >= 4:
+        XUnitWriter(session.result).write(xunit)
+    else:
+        XUnitWriter(session.result, skip_noncritical=False).write(xunit)
+
+    passed, failed, skipped = get_statistics(session.result)
+    return {
+        "notebook": path,
+        "passed": passed,
+        "failed": failed,
+        "skipped": skipped,
+        "errors": errors,
+        "output": output,
+        "xunit": xunit,
+    }
+
+
+def get_error_summary(path: str, error: Exception):
+    return {
+        "notebook": os.path.abspath(path), "passed": 0, "failed": 0, "skipped": 0,
+        "errors": [f"{type(error).__name__}: {error}"], "output": None, "xunit": None,
+    }
+
+
+def run_notebooks(notebooks, outputdir: str, processes: int = None, batch: bool = False):
+    """Run notebooks concurrently in worker processes, yielding their summaries as they complete, see run_notebook."""
+    outputdirs = get_outputdirs(notebooks, outputdir)
+    if processes == 1:
+        for path, notebook_outputdir in zip(notebooks, outputdirs):
+            try:
+                yield run_notebook(path, notebook_outputdir, batch)
+            except Exception as e:
+                yield get_error_summary(path, e)
+        return
+
+    with ProcessPoolExecutor(processes, mp_context=get_context()) as executor:
+        futures = {
+            executor.submit(run_notebook, path, notebook_outputdir, batch): path
+            for path, notebook_outputdir in zip(notebooks, outputdirs)
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield get_error_summary(futures[future], e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="robotframework-notebook",
+        description="Execute Robot Framework notebooks without Jupyter, writing output.xml and xunit.xml files.",
+    )
+    parser.add_argument("paths", nargs="+", help="notebooks, or directories searched for notebooks")
+    parser.add_argument("-d", "--outputdir", default="results",
+                        help="directory of the results, one subdirectory per notebook (default: results)")
+    parser.add_argument("-j", "--processes", type=int, default=None,
+                        help="number of notebooks run concurrently (default: number of CPUs)")
+    parser.add_argument("--batch", action="store_true",
+                        help="run the tests of all the cells of a notebook in a single execution, once all its "
+                             "keywords and variables are defined, instead of cell by cell")
+    args = parser.parse_args(argv)
+
+    notebooks = find_notebooks(args.paths)
+    if not notebooks:
+        parser.error("no notebook found")
+
+    success = True
+    for summary in run_notebooks(notebooks, args.outputdir, args.processes, args.batch):
+        ok = not summary["failed"] and not summary["errors"]
+        success = success and ok
+        print(
+            f"{'PASS' if ok else 'FAIL'} {summary['notebook']}: {summary['passed']} passed, "
+            f"{summary['failed']} failed, {summary['skipped']} skipped"
+        )
+        for error in summary["errors"]:
+            print(f"    {error}")
+
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
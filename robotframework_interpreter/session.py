@@ -0,0 +1,67 @@
+"""Combined result of all the cells executed in a session."""
+
+from copy import deepcopy
+import os
+from threading import Lock
+
+from robot.result import Result, TestSuite
+
+from .report import write_result_log
+from .utils import ScreenshotOptions, process_result_screenshots
+
+
+class SessionResult:
+    """The results of the cells executed in a session, merged in one result as they come.
+
+    Each cell result suite is appended as a child suite of the session suite, so adding a cell
+    only costs a copy of its own result, whatever the length of the session."""
+
+    def __init__(self, name: str = "Session", screenshot_options: ScreenshotOptions = None):
+        self.result = Result(root_suite=TestSuite(name=name))
+        self.screenshot_options = screenshot_options
+        self._lock = Lock()
+
+    def append(self, result, outputdir: str = None, name: str = None):
+        """Add the result of a cell, returning its suite in the session result.
+
+        Screenshots are embedded from the output directory as it may not outlive the cell execution."""
+        cell = Result(root_suite=deepcopy(result.suite), rpa=result.rpa)
+        cell.errors.messages.extend(deepcopy(list(result.errors.messages)))
+        if outputdir is not None:
+            process_result_screenshots(cell, outputdir, self.screenshot_options)
+
+        with self._lock:
+            if not self.result.suite.suites:
+                self.result.rpa = result.rpa
+            cell.suite.name = name or f"Cell {len(self.result.suite.suites) + 1}"
+            self.result.suite.suites.append(cell.suite)
+            self.result.errors.messages.extend(cell.errors.messages)
+
+        return cell.suite
+
+    def save(self, path: str):
+        """Write the session result as an output.xml file."""
+        with self._lock:
+            self.result.save(path)
+
+    def write_log(self, path: str):
+        """Write the log of the session."""
+        with self._lock:
+            write_result_log(self.result, path, self.result.rpa)
+
+    def export(self, outputdir: str):
+        """Write the output.xml and log.html files of the session to a directory, returning their paths."""
+        os.makedirs(outputdir, exist_ok=True)
+        output = os.path.join(outputdir, "output.xml")
+        log = os.path.join(outputdir, "log.html")
+        self.save(output)
+        self.write_log(log)
+        return output, log
+
+    def clear(self):
+        with self._lock:
+            self.result.suite.suites.clear()
+            self.result.errors.messages.clear()
+
+    def __len__(self):
+        return len(self.result.suite.suites)
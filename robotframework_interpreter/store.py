@@ -0,0 +1,144 @@
+"""Bookkeeping of the test suite resource (imports, variables and keywords) across cell executions."""
+
+import re
+from weakref import WeakKeyDictionary
+
+from robot.running.model import ResourceFile
+from robot.utils import normalize
+
+
+ITEM_LISTS = ("imports", "variables", "keywords")
+INDEXED_LISTS = ("variables", "keywords")
+
+VARIABLE_NAME_REGEXP = re.compile(r"^[$@&%]\{(.*)\}$")
+
+
+def normalize_name(name: str):
+    """Normalize a variable or keyword name, following Robot Framework case, space and underscore insensitive rules."""
+    match = VARIABLE_NAME_REGEXP.match(name)
+    if match:
+        name = match.group(1)
+    return normalize(name, ignore="_")
+
+
+class ResourceIndex:
+    """Normalized name index of the variables and keywords of a suite resource.
+
+    Inserting an item which name is already defined replaces the existing item in place."""
+
+    def __init__(self, resource: ResourceFile):
+        self.resource = resource
+        self.positions = {}
+        self.lengths = {}
+        self.reindex()
+
+    def reindex(self):
+        """Rebuild the index, dropping duplicated items from the resource."""
+        for name in INDEXED_LISTS:
+            items = getattr(self.resource, name)
+            positions = {}
+            unique = []
+            for item in items:
+                key = normalize_name(item.name)
+                if key in positions:
+                    unique[positions[key]] = item
+                else:
+                    positions[key] = len(unique)
+                    unique.append(item)
+            items._items = unique
+            self.positions[name] = positions
+            self.lengths[name] = len(unique)
+
+    def is_stale(self):
+        """Whether the resource was modified without going through the index."""
+        return any(len(getattr(self.resource, name)) != self.lengths[name] for name in INDEXED_LISTS)
+
+    def find(self, name: str, item_name: str):
+        """Get the item of the given resource list matching a name."""
+        index = self.positions[name].get(normalize_name(item_name))
+        return getattr(self.resource, name)[index] if index is not None else None
+
+    def insert(self, name: str, item):
+        """Add an item to the given resource list, returning the (index, item) it replaced if any."""
+        items = getattr(self.resource, name)
+        key = normalize_name(item.name)
+        index = self.positions[name].get(key)
+        if index is None:
+            self.positions[name][key] = len(items)
+            items.append(item)
+            self.lengths[name] += 1
+            return None
+        replaced = items[index]
+        items[index] = item
+        return index, replaced
+
+    def truncate(self, name: str, length: int):
+        """Remove the items of the given resource list after the given length."""
+        items = getattr(self.resource, name)
+        for item in items._items[length:]:
+            self.positions[name].pop(normalize_name(item.name), None)
+        del items[length:]
+        self.lengths[name] = len(items)
+
+
+_indexes = WeakKeyDictionary()
+
+
+def get_resource_index(resource: ResourceFile):
+    """Get the name index of a suite resource, creating it if needed."""
+    index = _indexes.get(resource)
+    if index is None or index.is_stale():
+        index = _indexes[resource] = ResourceIndex(resource)
+    return index
+
+
+class ResourceJournal:
+    """Journal of the changes a cell makes to a suite resource.
+
+    Items are only appended to the resource lists or replaced in place, so the
+    journal only records the initial list lengths and the replaced items. Both
+    commit and revert run in time proportional to the changes of the cell."""
+
+    def __init__(self, resource: ResourceFile):
+        self.resource = resource
+        self.index = get_resource_index(resource)
+        self.lengths = {}
+        self.replaced = {}
+        self.commit()
+
+    def insert(self, name: str, item):
+        """Add a variable or a keyword to the resource, replacing any item with the same name."""
+        replaced = self.index.insert(name, item)
+        # Only the original item of slots existing before the cell matters
+        if replaced is not None and replaced[0] < self.lengths[name]:
+            self.replaced[name].setdefault(*replaced)
+
+    def added(self, name: str):
+        """Get items added or replaced in the given resource list since the last commit."""
+        items = getattr(self.resource, name)
+        return (
+            [items[index] for index in sorted(self.replaced[name])] +
+            items._items[self.lengths[name]:]
+        )
+
+    def shadowed(self, name: str):
+        """Get the names of the items replaced in the given resource list since the last commit."""
+        return [item.name for _, item in sorted(self.replaced[name].items())]
+
+    def commit(self):
+        """Accept the current resource state."""
+        for name in ITEM_LISTS:
+            self.lengths[name] = len(getattr(self.resource, name))
+            self.replaced[name] = {}
+
+    def revert(self):
+        """Restore the resource state of the last commit."""
+        for name in ITEM_LISTS:
+            items = getattr(self.resource, name)
+            if name in INDEXED_LISTS:
+                self.index.truncate(name, self.lengths[name])
+            else:
+                del items[self.lengths[name]:]
+            for index, item in self.replaced[name].items():
+                items[index] = item
+        self.commit()
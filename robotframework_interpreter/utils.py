@@ -1,4 +1,8 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import gzip
+from hashlib import sha1
 from io import BytesIO
 import base64
 import binascii
@@ -6,6 +10,8 @@ import urllib
 from urllib.parse import unquote
 import mimetypes
 import re
+import shutil
+from tempfile import NamedTemporaryFile
 import json
 from json import JSONDecodeError
 from typing import List
@@ -13,9 +19,11 @@ from difflib import SequenceMatcher
 from copy import deepcopy
 from operator import itemgetter
 
+from .cache import LRUCache
 from .robot_version import ROBOT_MAJOR_VERSION
 
 from robot.libraries import STDLIBS
+from robot.result import ResultVisitor
 
 if ROBOT_MAJOR_VERSION == 4:
     from robot.libdocpkg.htmlutils import DocToHtml
@@ -33,68 +41,285 @@ from pygments.formatters import HtmlFormatter
 from pygments.lexers import get_lexer_by_name
 import pygments
 
-from .constants import SCRIPT_DISPLAY_LOG, NAME_REGEXP
+from .constants import (
+    SCRIPT_DISPLAY_LOG, SCRIPT_DISPLAY_COMPRESSED_LOG, SCRIPT_DISPLAY_VIEWER_LOG, HTML_LOG_TEMPLATE,
+    NAME_REGEXP, IMG_SRC_REGEXP, SCREENSHOT_REGEXP
+)
+
+
+# Data URIs of the screenshots embedded in logs, by image content hash
+SCREENSHOT_CACHE = LRUCache(maxsize=128, maxbytes=64 * 1024 * 1024)
 
 
 def data_uri(mimetype, data):
     return "data:{};base64,{}".format(mimetype, base64.b64encode(data).decode("utf-8"))
 
 
-def process_screenshots(outputdir: str):
+def load_screenshot(src: str, outputdir: str):
+    """Get the content of an image referenced in the output, None if it cannot be found."""
     cwd = os.getcwd()
 
-    with open(os.path.join(outputdir, "output.xml"), encoding="utf-8") as fp:
-        xml = fp.read()
-
-    for src in re.findall('img src="([^"]+)', xml):
-        if os.path.exists(src):
-            filename = src
-        elif os.path.exists(os.path.join(outputdir, src)):
-            filename = os.path.join(outputdir, src)
-        elif os.path.exists(os.path.join(cwd, src)):
-            filename = os.path.join(cwd, src)
-        elif src.startswith("data:"):
-            filename = None
-            try:
-                spec, uri = src.split(",", 1)
-                spec, encoding = spec.split(";", 1)
-                spec, mimetype = spec.split(":", 1)
-                if not (encoding == "base64" and mimetype.startswith("image/")):
-                    continue
-                data = base64.b64decode(unquote(uri).encode("utf-8"))
-                im = Image.open(BytesIO(data))
-            except (binascii.Error, IndexError, ValueError):
-                continue
-        else:
-            continue
-        if filename:
-            im = Image.open(filename)
-            mimetype = Image.MIME[im.format]
-            # Fix issue where Pillow on Windows returns APNG for PNG
-            if mimetype == "image/apng":
-                mimetype = "image/png"
+    for filename in (src, os.path.join(outputdir, src), os.path.join(cwd, src)):
+        if os.path.exists(filename):
             with open(filename, "rb") as fp:
-                data = fp.read()
-        uri = data_uri(mimetype, data)
-        xml = xml.replace('a href="{}"'.format(src), "a")
-        xml = xml.replace(
-            'img src="{}" width="800px"'.format(src),
-            'img src="{}" style="max-width:800px;"'.format(uri),
+                return fp.read()
+
+    if src.startswith("data:"):
+        try:
+            spec, uri = src.split(",", 1)
+            spec, encoding = spec.split(";", 1)
+            spec, mimetype = spec.split(":", 1)
+            if not (encoding == "base64" and mimetype.startswith("image/")):
+                return None
+            return base64.b64decode(unquote(uri).encode("utf-8"))
+        except (binascii.Error, IndexError, ValueError):
+            return None
+
+    return None
+
+
+class ScreenshotOptions:
+    """Options for the screenshots embedded in logs.
+
+    Images wider than max_width pixels are downscaled, and images are re-encoded to the given Pillow format
+    (e.g. "WEBP" or "JPEG") with the given quality if any. The original files are left untouched."""
+
+    def __init__(self, max_width: int = None, format: str = None, quality: int = None):
+        self.max_width = max_width
+        self.format = format.upper() if format else None
+        self.quality = quality
+
+    def key(self):
+        return (self.max_width, self.format, self.quality)
+
+    def __repr__(self):
+        return "ScreenshotOptions(max_width={!r}, format={!r}, quality={!r})".format(*self.key())
+
+
+def transform_image(data: bytes, options: ScreenshotOptions):
+    """Downscale and re-encode an image following the screenshot options, returning its new content."""
+    im = Image.open(BytesIO(data))
+    image_format = options.format or im.format
+    too_wide = options.max_width is not None and im.width > options.max_width
+
+    if not too_wide and image_format == im.format and options.quality is None:
+        return data
+
+    if too_wide:
+        im.thumbnail((options.max_width, im.height))
+    if image_format == "JPEG" and im.mode not in ("RGB", "L"):
+        im = im.convert("RGB")
+
+    save_options = {"quality": options.quality} if options.quality is not None else {}
+    output = BytesIO()
+    try:
+        im.save(output, format=image_format, **save_options)
+    except (KeyError, OSError, ValueError):
+        # This Pillow build cannot write the requested format
+        return data
+    return output.getvalue()
+
+
+def image_data_uri(data: bytes, options: ScreenshotOptions = None):
+    if options is not None:
+        data = transform_image(data, options)
+    im = Image.open(BytesIO(data))
+    mimetype = Image.MIME[im.format]
+    # Fix issue where Pillow on Windows returns APNG for PNG
+    if mimetype == "image/apng":
+        mimetype = "image/png"
+    return data_uri(mimetype, data)
+
+
+def screenshot_data_uri(src: str, outputdir: str, cache: LRUCache = None, options: ScreenshotOptions = None):
+    """Get the data URI of an image referenced in the output, None if it cannot be embedded.
+
+    Data URIs are looked up in the cache by image content hash and screenshot options."""
+    data = load_screenshot(src, outputdir)
+    if data is None:
+        return None
+
+    key = (sha1(data).hexdigest(), options.key() if options is not None else None)
+    uri = cache.get(key) if cache is not None else None
+    if uri is None:
+        try:
+            uri = image_data_uri(data, options)
+        except OSError:
+            return None
+        if cache is not None:
+            cache.put(key, uri)
+    return uri
+
+
+def encode_screenshots(sources, outputdir: str, cache: LRUCache = SCREENSHOT_CACHE, max_workers: int = None,
+                       options: ScreenshotOptions = None):
+    """Get the data URIs of the distinct image sources, encoded in a thread pool."""
+    sources = list(dict.fromkeys(sources))
+    encode = partial(screenshot_data_uri, outputdir=outputdir, cache=cache, options=options)
+
+    if len(sources) < 2:
+        return {src: encode(src) for src in sources}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(sources, executor.map(encode, sources)))
+
+
+def embed_screenshots(text: str, outputdir: str, uris: dict = None, options: ScreenshotOptions = None,
+                      cache: LRUCache = SCREENSHOT_CACHE):
+    """Replace images referenced in an HTML log message (or output.xml content) by data URIs.
+
+    Links to the images are removed. The text is scanned once, data URIs missing from the uris dict are computed
+    and added to it."""
+    if 'img src="' not in text:
+        return text
+
+    if uris is None:
+        uris = {}
+    sources = set(IMG_SRC_REGEXP.findall(text))
+
+    def replace(match):
+        href, src, width = match.groups()
+        target = href or src
+        if target not in sources:
+            return match.group(0)
+        if target not in uris:
+            uris[target] = screenshot_data_uri(target, outputdir, cache, options)
+        uri = uris[target]
+        if uri is None:
+            return match.group(0)
+        if href:
+            return "a"
+        if width:
+            return 'img src="{}" style="max-width:800px;"'.format(uri)
+        return 'img src="{}"'.format(uri)
+
+    return SCREENSHOT_REGEXP.sub(replace, text)
+
+
+def process_screenshots(outputdir: str, options: ScreenshotOptions = None, cache: LRUCache = SCREENSHOT_CACHE):
+    """Embed the images referenced in the output.xml of the output directory.
+
+    The file is scanned once for images, which are encoded in parallel, then streamed line by line to a new file
+    which replaces it."""
+    path = os.path.join(outputdir, "output.xml")
+
+    with open(path, encoding="utf-8") as source:
+        uris = encode_screenshots(
+            (src for line in source for src in IMG_SRC_REGEXP.findall(line)), outputdir, cache, options=options
         )
-        xml = xml.replace('img src="{}"'.format(src), 'img src="{}"'.format(uri))
 
-    with open(os.path.join(outputdir, "output.xml"), "w", encoding="utf-8") as fp:
-        fp.write(xml)
+    if not uris:
+        return
+
+    with open(path, encoding="utf-8") as source, NamedTemporaryFile(
+        "w", encoding="utf-8", dir=outputdir, suffix=".xml", delete=False
+    ) as target:
+        try:
+            for line in source:
+                target.write(embed_screenshots(line, outputdir, uris, options, cache))
+        except BaseException:
+            target.close()
+            os.remove(target.name)
+            raise
+
+    os.replace(target.name, path)
+
+
+class ScreenshotsCollector(ResultVisitor):
+    """Collect the HTML messages of a result which reference images."""
+
+    def __init__(self):
+        self.messages = []
 
+    def visit_message(self, msg):
+        if msg.html and 'img src="' in msg.message:
+            self.messages.append(msg)
 
-def display_log(html, filename=""):
+
+def process_result_screenshots(result, outputdir: str, options: ScreenshotOptions = None,
+                               cache: LRUCache = SCREENSHOT_CACHE):
+    """Embed screenshots in the messages of an in-memory result, modifying it.
+
+    Returns the (message, original text) of the modified messages."""
+    collector = ScreenshotsCollector()
+    result.visit(collector)
+
+    uris = encode_screenshots(
+        (src for msg in collector.messages for src in IMG_SRC_REGEXP.findall(msg.message)), outputdir, cache,
+        options=options
+    )
+
+    originals = []
+    for msg in collector.messages:
+        originals.append((msg, msg.message))
+        msg.message = embed_screenshots(msg.message, outputdir, uris, options, cache)
+    return originals
+
+
+def copy_output(outputdir: str, target: str, result=None):
+    """Copy the output.xml of an output directory, or save the result as output.xml, to the target directory.
+
+    The relative image files it references are copied along, the other files of the output directory are not."""
+    os.makedirs(target, exist_ok=True)
+    output = os.path.join(target, "output.xml")
+    if result is None:
+        shutil.copyfile(os.path.join(outputdir, "output.xml"), output)
+        with open(output, encoding="utf-8") as fp:
+            sources = {src for line in fp for src in IMG_SRC_REGEXP.findall(line)}
+    else:
+        result.save(output)
+        collector = ScreenshotsCollector()
+        result.visit(collector)
+        sources = {src for msg in collector.messages for src in IMG_SRC_REGEXP.findall(msg.message)}
+
+    root = os.path.abspath(target)
+    for src in sources:
+        if src.startswith("data:") or os.path.isabs(src):
+            continue
+        destination = os.path.abspath(os.path.join(target, src))
+        if not destination.startswith(root + os.sep):
+            continue
+        for filename in (os.path.join(outputdir, src), os.path.join(os.getcwd(), src)):
+            if os.path.isfile(filename):
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                shutil.copyfile(filename, destination)
+                break
+
+
+def display_log(html, filename="", compress=True):
+    """Get the script opening the log in a new window.
+
+    The log is gzipped by default and inflated by the browser."""
     if isinstance(html, str):
         html = html.encode("utf-8")
+    if compress:
+        return SCRIPT_DISPLAY_COMPRESSED_LOG.format(
+            content=compress_content(html), filename=filename
+        )
     return SCRIPT_DISPLAY_LOG.format(
         content=base64.b64encode(html).decode("utf-8"), filename=filename
     )
 
 
+def compress_content(content):
+    """Gzip and base64 encode a text or bytes content."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return base64.b64encode(gzip.compress(content)).decode("utf-8")
+
+
+def display_log_model(model, template_id, placeholder, filename=""):
+    """Get the script opening in a new window the log template shipped as template_id, filled with the model."""
+    return SCRIPT_DISPLAY_VIEWER_LOG.format(
+        content=compress_content(model), template_id=template_id, placeholder=placeholder, filename=filename
+    )
+
+
+def embed_log_template(template, template_id):
+    """Get the hidden HTML element shipping a log template to the frontend."""
+    return HTML_LOG_TEMPLATE.format(content=compress_content(template), template_id=template_id)
+
+
 def highlight(language, data):
     lexer = get_lexer_by_name(language)
     formatter = HtmlFormatter(noclasses=True, nowrap=True)
@@ -297,6 +522,6 @@ def get_keyword_doc(keyword):
         "text/plain": title + "\n\n" + body,
         "text/html": f"<p>{title_html}</p>" +
         NAME_REGEXP.sub(
-            lambda m: f"<code>{m.group(1)}</code>", DocToHtml(keyword.doc_format)(body)
+            lambda m: f"<code>{m.group(1)}</code>", DocToHtml(getattr(keyword, "doc_format", "ROBOT"))(body)
         ),
     }
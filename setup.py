@@ -23,6 +23,11 @@ setup(
         'pygments',
         'ipywidgets'
     ],
+    entry_points={
+        'console_scripts': [
+            'robotframework-notebook = robotframework_interpreter.runner:main',
+        ],
+    },
     extras_require={
         'testing': ['flake8'],
     },
@@ -0,0 +1,78 @@
+import os
+import time
+
+from robotframework_interpreter import artifacts
+from robotframework_interpreter.artifacts import ArtifactStore
+
+
+def make_output(path, content):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "output.xml"), "w") as fp:
+        fp.write(content)
+    return str(path)
+
+
+def test_artifact_store(tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"), max_size=None, max_age=None)
+
+    key = store.put(make_output(tmp_path / "first", "first"))
+    assert key in store
+    assert store.put(make_output(tmp_path / "same", "first")) == key
+    assert len(store) == 1
+
+    with open(os.path.join(store.get(key), "output.xml")) as fp:
+        assert fp.read() == "first"
+
+    assert store.get("missing") is None
+    assert not [name for name in os.listdir(store.root) if name not in store.keys()]
+
+
+def test_artifact_store_eviction(tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"), max_size=250, max_age=3600)
+
+    old = store.put(make_output(tmp_path / "old", "old"))
+    os.utime(store.path(old), (time.time() - 7200, time.time() - 7200))
+    first = store.put(make_output(tmp_path / "first", "1" * 100))
+    assert old not in store
+
+    second = store.put(make_output(tmp_path / "second", "2" * 100))
+    store.get(first)
+    os.utime(store.path(second), (time.time() - 60, time.time() - 60))
+    third = store.put(make_output(tmp_path / "third", "3" * 100))
+
+    assert first in store and third in store
+    assert second not in store
+    assert store.size() <= 250
+
+
+def test_artifact_store_size_index(tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path / "store"), max_size=1000, max_age=None)
+    for index in range(3):
+        store.put(make_output(tmp_path / str(index), str(index) * 100))
+
+    walked = []
+    original = artifacts.get_directory_size
+    monkeypatch.setattr(artifacts, "get_directory_size", lambda path: walked.append(path) or original(path))
+
+    store.put(make_output(tmp_path / "last", "last"))
+    assert len(walked) == 1
+    assert store.size() == 300 + len("last")
+
+    # Artifacts stored by another store are measured once
+    other = ArtifactStore(store.root, max_size=1000, max_age=None)
+    other.size()
+    other.size()
+    assert len(walked) == 5
+
+
+def test_artifact_store_contents(tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"), max_size=None, max_age=None)
+    outputdir = make_output(tmp_path / "output", '<msg html="true">&lt;img src="images/capture.png"&gt;</msg>')
+    os.makedirs(os.path.join(outputdir, "images"))
+    for filename in ("images/capture.png", "unrelated.bin"):
+        with open(os.path.join(outputdir, filename), "wb") as fp:
+            fp.write(b"0" * 100)
+
+    key = store.put(outputdir)
+    assert sorted(os.listdir(store.path(key))) == ["images", "output.xml"]
+    assert os.listdir(os.path.join(store.path(key), "images")) == ["capture.png"]
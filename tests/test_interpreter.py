@@ -1,7 +1,53 @@
+import asyncio
+from io import StringIO
+import os
+import time
+import tracemalloc
+
+import pytest
+
 from ipywidgets import DOMWidget
 
-from robotframework_interpreter import init_suite, execute, complete
+from PIL import Image
+
+from robot.errors import DataError
+from robot.output import LOGGER
+from robot.result import ResultVisitor
+
+from robotframework_interpreter import (
+    init_suite, execute, execute_async, execute_many, complete, inspect, open_artifact,
+    ProgressUpdater, StatusEventListener
+)
+from robotframework_interpreter import report as report_module
+from robotframework_interpreter.artifacts import ArtifactStore
+from robotframework_interpreter.cache import LRUCache
+from robotframework_interpreter.errors import ERROR_COLLECTOR, ErrorCollector
+from robotframework_interpreter.interpreter import RingBufferStream, TestSuiteError
+from robotframework_interpreter.report import LOG_MODEL_PLACEHOLDER, generate_report, get_log_template, reset_log_viewer
 from robotframework_interpreter.robot_version import ROBOT_MAJOR_VERSION
+from robotframework_interpreter.utils import ScreenshotsCollector
+
+
+MESSAGE_CELL = """\
+*** Test Cases ***
+Logging Test
+    Log  Hello from the log
+"""
+
+
+SCREENSHOT_CELL = """\
+*** Test Cases ***
+Screenshot Test
+    Log  <img src="capture.png">  html=True
+"""
+
+
+class MessagesCollector(ResultVisitor):
+    def __init__(self):
+        self.messages = []
+
+    def visit_message(self, msg):
+        self.messages.append(msg.message)
 
 
 CELL1 = """\
@@ -34,6 +80,12 @@ Get head
     Should be equal  ${head}  1
 """
 
+ERROR_CELL = """\
+*** Settings ***
+
+Library  NotExistingLibrary
+"""
+
 INCOMPLETE_CELL1 = """
 *** Keywords ***
 
@@ -74,6 +126,20 @@ def test_execution():
         assert result.statistics.total.critical.passed == 1
 
 
+def test_result_messages():
+    suite = init_suite('test suite')
+
+    result, _ = execute(MESSAGE_CELL, suite)
+    collector = MessagesCollector()
+    result.visit(collector)
+    assert 'Hello from the log' in collector.messages
+
+    (result, _), = execute_many([MESSAGE_CELL], suite)
+    collector = MessagesCollector()
+    result.visit(collector)
+    assert 'Hello from the log' in collector.messages
+
+
 def test_keywords_completion():
     suite = init_suite('test suite')
 
@@ -87,3 +153,402 @@ def test_keywords_completion():
     assert '${value}' in completion['matches']
     assert '${False}' in completion['matches']
     assert '${SPACE}' in completion['matches']
+
+
+def test_parse_cache():
+    suite = init_suite('test suite')
+    cache = LRUCache(maxsize=2)
+
+    execute(CELL1, suite, parse_cache=None)
+    execute(CELL3, suite, parse_cache=cache)
+    execute(CELL3, suite, parse_cache=cache)
+
+    assert cache.info()['hits'] == 1
+    assert cache.info()['misses'] == 1
+    assert len(suite.resource.keywords) == 1
+
+    result, _ = execute(CELL4, suite, parse_cache=cache)
+    result, _ = execute(CELL4, suite, parse_cache=cache)
+
+    assert cache.info()['hits'] == 2
+    assert len(cache) == 2
+    assert len(suite.tests) == 0
+
+    if ROBOT_MAJOR_VERSION == 4:
+        assert result.statistics.total.passed == 1
+    else:
+        assert result.statistics.total.critical.passed == 1
+
+
+def test_error_collector_soak():
+    collector = ErrorCollector()
+
+    def run_cells(count):
+        for _ in range(count):
+            with LOGGER:
+                with collector.capture() as errors:
+                    LOGGER.error("Importing library 'Missing' failed")
+            assert len(errors) == 2
+
+    run_cells(1000)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    run_cells(10000)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert LOGGER._error_listener in (None, collector)
+    assert not collector.armed
+    assert after - before < 100 * 1024
+
+
+def test_error_collector_execution():
+    suite = init_suite('test suite')
+
+    for _ in range(50):
+        with pytest.raises(TestSuiteError):
+            execute(ERROR_CELL, suite)
+
+    assert not ERROR_COLLECTOR.armed
+    assert LOGGER._error_listener in (None, ERROR_COLLECTOR)
+    assert len(suite.resource.imports) == 0
+
+
+def test_failure_rollback():
+    suite = init_suite('test suite')
+
+    execute(CELL1, suite)
+    execute(CELL3, suite)
+    keyword = suite.resource.keywords[0]
+
+    with pytest.raises(TestSuiteError):
+        execute(ERROR_CELL + CELL2 + CELL3 + CELL4, suite)
+
+    assert list(suite.resource.keywords) == [keyword]
+    assert len(suite.resource.variables) == 0
+    assert len(suite.resource.imports) == 1
+    assert len(suite.tests) == 0
+
+
+def test_user_keyword_inspection():
+    suite = init_suite('test suite')
+
+    execute(CELL3, suite)
+    execute(CELL3.replace('Head', 'head'), suite)
+
+    assert len(suite.resource.keywords) == 1
+
+    inspection = inspect('    Head  ${list}', 6, suite)
+
+    assert inspection['found']
+    assert inspection['data']['text/plain'].startswith('head')
+
+
+def test_lazy_log():
+    suite = init_suite('test suite')
+
+    execute(CELL1, suite)
+    execute(CELL3, suite)
+    result, report = execute(CELL4, suite, log_mode='lazy')
+
+    assert len(report) == 1
+    assert isinstance(report[0], DOMWidget)
+
+    button = report[0].children[0].children[0]
+    summary = report[0].children[0].children[1]
+    assert '1 passed, 0 failed' in summary.value
+
+    button.click()
+
+    retained = report_module._retained_outputs[-1]
+    assert os.path.exists(os.path.join(retained, 'log.html'))
+    report[0].close()
+    assert not os.path.isdir(retained)
+    button.click()
+
+
+def test_lazy_log_retention(monkeypatch):
+    monkeypatch.setattr(report_module, 'MAX_RETAINED_OUTPUTS', 2)
+    suite = init_suite('test suite')
+    execute(CELL1, suite)
+    execute(CELL3, suite)
+
+    retained = []
+    for _ in range(3):
+        _, report = execute(CELL4, suite, log_mode='lazy')
+        retained.append(report_module._retained_outputs[-1])
+    assert [os.path.isdir(path) for path in retained] == [False, True, True]
+
+    report[0].close()
+    assert not os.path.isdir(retained[-1])
+
+
+def test_lazy_log_copy(tmp_path):
+    Image.new('RGB', (4, 4)).save(str(tmp_path / 'capture.png'))
+    (tmp_path / 'unrelated.bin').write_bytes(b'0' * 1000)
+    suite = init_suite('test suite')
+
+    _, report = execute(SCREENSHOT_CELL, suite, outputdir=str(tmp_path), log_mode='lazy')
+
+    retained = report_module._retained_outputs[-1]
+    assert sorted(os.listdir(retained)) == ['capture.png', 'output.xml']
+    report[0].close()
+
+
+def test_report_size_limit(tmp_path):
+    suite = init_suite('test suite')
+    execute(CELL1, suite)
+    test = suite.tests.create(name='Test')
+    if ROBOT_MAJOR_VERSION == 4:
+        test.body.create_keyword('Log', args=['Hello'])
+    else:
+        test.keywords.create('Log', args=['Hello'])
+    result = suite.run(outputdir=str(tmp_path), output='NONE', log='NONE', report='NONE', stdout=StringIO())
+
+    assert 'text/html' in generate_report(suite, str(tmp_path), result)
+
+    report = generate_report(suite, str(tmp_path), result, max_inline_size=1000)
+    assert isinstance(report[0], DOMWidget)
+
+
+def test_viewer_log():
+    reset_log_viewer()
+    suite = init_suite('test suite')
+
+    execute(CELL1, suite)
+    execute(CELL3, suite)
+    result, first = execute(CELL4, suite, log_mode='viewer')
+    result, second = execute(CELL4, suite, log_mode='viewer')
+
+    template, template_id = get_log_template()
+    assert LOG_MODEL_PLACEHOLDER in template
+    assert 'id="{}"'.format(template_id) in first['text/html']
+    assert "localStorage.setItem('{}'".format(template_id) in first['text/html']
+    assert template_id in second['text/html']
+    assert 'id="{}"'.format(template_id) not in second['text/html']
+    assert len(second['text/html']) * 5 < len(first['text/html'])
+
+
+def test_artifact_log(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    suite = init_suite('test suite')
+
+    execute(CELL1, suite)
+    execute(CELL3, suite)
+    result, report = execute(CELL4, suite, log_mode='artifact', artifact_store=store)
+
+    assert len(store) == 1
+    key = store.keys()[0]
+    assert key in report[0].children[0].children[1].value
+
+    assert 'Download' in open_artifact(key, store).data
+    assert os.path.exists(os.path.join(store.path(key), 'log.html'))
+
+    with pytest.raises(KeyError):
+        open_artifact('missing', store)
+
+
+def test_background_report():
+    suite = init_suite('test suite')
+
+    execute(CELL1, suite)
+    execute(CELL3, suite)
+    result, report = execute(CELL4, suite, background_report=True)
+
+    assert result is not None
+    assert isinstance(report[0], DOMWidget)
+
+    report[0].future.result(timeout=30)
+    assert 'Log' in report[0].outputs[0]['data']['text/html']
+
+    result, report = execute(CELL4, suite, log_mode='lazy', background_report=True)
+    report[0].future.result(timeout=30)
+    assert 'application/vnd.jupyter.widget-view+json' in report[0].outputs[0]['data']
+
+
+@pytest.mark.parametrize('background_report', [False, True])
+def test_report_result_unchanged(tmp_path, background_report):
+    Image.new('RGB', (4, 4)).save(str(tmp_path / 'capture.png'))
+    suite = init_suite('test suite')
+
+    result, report = execute(SCREENSHOT_CELL, suite, outputdir=str(tmp_path), background_report=background_report)
+    if background_report:
+        report[0].future.result(timeout=30)
+    assert 'data:image/png;base64' in (tmp_path / 'log.html').read_text()
+
+    collector = ScreenshotsCollector()
+    result.visit(collector)
+    assert [msg.message for msg in collector.messages] == ['<img src="capture.png">']
+
+
+def test_stream_results():
+    displayed = []
+    updater = ProgressUpdater(displayed.append, displayed.append, stream_results=True)
+    suite = init_suite('test suite')
+
+    execute(CELL1, suite)
+    execute(CELL3, suite)
+    execute(CELL4 + '\nFailing Test\n    Fail  Something <wrong>\n', suite,
+            stdout=updater, listeners=[StatusEventListener(updater.update)])
+
+    updater.flush_display()
+
+    assert [result['status'] for result in updater.results] == ['PASS', 'FAIL']
+    assert '1 passed, 1 failed, 0 skipped' in displayed[-1]['text/html']
+    assert 'Something &lt;wrong&gt;' in displayed[-1]['text/html']
+
+
+def test_progress_rate_limit():
+    displayed = []
+    updater = ProgressUpdater(displayed.append, displayed.append, max_frequency=1)
+
+    for index in range(1000):
+        updater.update({'keyword': f'Keyword {index}'})
+    assert len(displayed) == 1
+
+    updater.flush_display()
+    assert len(displayed) == 2
+    assert 'Keyword 999' in displayed[-1]['text/html']
+
+    updater.update({'keyword': 'Last keyword'})
+    updater.clear()
+    assert displayed[-1] == {'text/plain': ''}
+
+
+def test_ring_buffer_stream(tmp_path):
+    spill = str(tmp_path / 'console.txt')
+    stream = RingBufferStream(max_lines=100, spill=spill)
+
+    for index in range(10000):
+        stream.write(f'Line {index}')
+        stream.write('\n')
+    stream.close()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 100
+    assert lines[0] == 'Line 9900' and lines[-1] == 'Line 9999'
+    assert stream.dropped_lines == 9900
+    with open(spill) as fp:
+        assert len(fp.read().splitlines()) == 10000
+
+    stream = RingBufferStream(max_lines=None, max_bytes=50)
+    stream.write('a' * 30 + '\n')
+    stream.write('b' * 30 + '\n')
+    assert stream.getvalue() == 'b' * 30 + '\n'
+    stream.write('c' * 100)
+    assert stream.getvalue() == 'c' * 50
+
+
+def test_progress_eta():
+    displayed = []
+    updater = ProgressUpdater(displayed.append, displayed.append, max_frequency=0)
+    updater.durations.update({'First': 10, 'Second': 20})
+
+    updater.update({'suite': 'Suite', 'tests': ['First', 'Second', 'Third'], 'total': 3})
+    assert updater.estimate_remaining() == 45
+    assert '0/3 (0%) ETA 45s' in displayed[-1]['text/html']
+
+    updater.update({'test': 'First'})
+    updater.update({'test_result': {'name': 'First', 'status': 'PASS', 'elapsed': 12, 'message': ''}})
+    assert updater.estimate_remaining() == 36
+    assert '1/3 (33%) ETA 36s' in displayed[-1]['text/html']
+    assert updater.durations['First'] == 12
+
+    for name in ['First', 'Second', 'Third']:
+        updater.durations.pop(name, None)
+
+
+PASSING_CELL = """\
+*** Test Cases ***
+
+Passing Test
+    Log  Passed
+"""
+
+LONG_CELL = """\
+*** Test Cases ***
+
+Long Test
+    FOR  ${index}  IN RANGE  100
+        Sleep  0.05
+    END
+
+Next Test
+    Log  Not run
+"""
+
+
+def test_execute_async():
+    suite = init_suite('test suite')
+
+    handle = execute_async(PASSING_CELL, suite)
+    result, report = asyncio.run(wait_for(handle))
+    assert result.return_code == 0
+
+    start = time.monotonic()
+    handle = execute_async(LONG_CELL, suite, deadline=0.3)
+    result, report = handle.result(timeout=30)
+    assert time.monotonic() - start < 3
+    assert 'deadline of 0.3s exceeded' in result.suite.tests[0].message
+    assert result.suite.tests[1].status == 'FAIL'
+
+    handle = execute_async(LONG_CELL, suite)
+    time.sleep(0.2)
+    handle.cancel()
+    result, report = handle.result(timeout=30)
+    assert handle.cancelled
+    assert result.suite.tests[0].message == 'Execution cancelled'
+
+    result, report = execute(PASSING_CELL, suite)
+    assert result.return_code == 0
+
+
+def test_execute_async_timeouts():
+    suite = init_suite('test suite')
+
+    cell = (
+        '*** Settings ***\nTest Timeout  10s\n'
+        '*** Test Cases ***\nSlow Test\n    [Timeout]  0.3s\n    Sleep  5s\n'
+        'Fast Test\n    Log  Done\n'
+    )
+    start = time.monotonic()
+    result, report = execute_async(cell, suite).result(timeout=30)
+    assert time.monotonic() - start < 3
+    assert result.suite.tests[0].message == 'Test timeout 300 milliseconds exceeded.'
+    assert result.suite.tests[1].status == 'PASS'
+
+
+async def wait_for(handle):
+    return await handle
+
+
+def test_execute_many(tmp_path):
+    suite = init_suite('test suite')
+
+    mixed = '*** Test Cases ***\nTest\n    Log  Test\n*** Tasks ***\nTask\n    Log  Task\n'
+    outcomes = execute_many([CELL1, CELL2, CELL3, CELL4, PASSING_CELL, mixed], suite)
+
+    assert [result is None for result, _ in outcomes] == [True, True, True, False, False, True]
+    assert [test.name for test in outcomes[3][0].suite.tests] == ['Get head']
+    assert [test.name for test in outcomes[4][0].suite.tests] == ['Passing Test']
+    assert outcomes[4][0].return_code == 0
+    assert isinstance(outcomes[5][1], DataError)
+    assert len(suite.resource.keywords) == 1
+    assert len(suite.tests) == 0
+
+    # Cells with failing imports are left out, the suite setup and tests being run once
+    suite = init_suite('test suite')
+    runs = tmp_path / 'runs.txt'
+    append_cell = (
+        f'*** Settings ***\nLibrary  OperatingSystem\nSuite Setup  Append To File  {runs}  setup\\n\n'
+        f'*** Test Cases ***\nAppend\n    Append To File  {runs}  test\\n\n'
+    )
+    outcomes = execute_many([CELL1, ERROR_CELL, CELL3, CELL4, append_cell], suite)
+
+    assert isinstance(outcomes[1][1], TestSuiteError)
+    assert [error is None for _, error in outcomes] == [True, False, True, True, True]
+    assert outcomes[3][0].suite.tests[0].status == 'PASS'
+    assert outcomes[4][0].suite.tests[0].status == 'PASS'
+    assert runs.read_text() == 'setup\ntest\n'
+    assert [item.name for item in suite.resource.imports] == ['Collections', 'OperatingSystem']
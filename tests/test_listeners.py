@@ -1,3 +1,4 @@
+from robotframework_interpreter import init_suite, execute, KeywordProfilerListener
 from robotframework_interpreter.listeners import ReturnValueListener
 
 
@@ -19,3 +20,43 @@ def test_result_has_value():
     assert not ReturnValueListener.has_value(None)
     assert not ReturnValueListener.has_value("")
     assert not ReturnValueListener.has_value(b"")
+
+
+PROFILED_CELL = """\
+*** Keywords ***
+Outer Keyword
+    FOR  ${i}  IN RANGE  2
+        Inner Keyword
+    END
+
+Inner Keyword
+    Sleep  0.05s
+
+*** Test Cases ***
+Profiled Test
+    Outer Keyword
+    Outer Keyword
+"""
+
+
+def test_keyword_profiler_listener():
+    profiler = KeywordProfilerListener()
+    execute(PROFILED_CELL, init_suite("test suite"), listeners=[profiler], log_mode="lazy")
+
+    rows = {row["keyword"]: row for row in profiler.top(n=10)}
+    assert [row["keyword"] for row in profiler.top(n=1)] == ["Sleep"]
+    assert rows["Sleep"]["library"] == "BuiltIn"
+    assert (rows["Outer Keyword"]["calls"], rows["Inner Keyword"]["calls"], rows["Sleep"]["calls"]) == (2, 4, 4)
+    assert rows["Sleep"]["self"] >= 0.2
+    assert rows["Outer Keyword"]["total"] >= rows["Sleep"]["total"]
+    assert rows["Outer Keyword"]["self"] < rows["Sleep"]["self"]
+
+    libraries = profiler.top(by_library=True)
+    assert libraries[0]["library"] == "BuiltIn"
+
+    bundle = profiler.get_mimebundle(n=2)
+    assert "<td>Sleep</td>" in bundle["text/html"]
+    assert len(bundle["text/plain"].splitlines()) == 3
+
+    profiler.reset()
+    assert profiler.top() == []
@@ -0,0 +1,98 @@
+from robotframework_interpreter import init_suite, execute, complete, inspect, PhaseMetrics, SESSION_METRICS
+from robotframework_interpreter.metrics import Histogram, SessionMetrics, TimedListener
+from robotframework_interpreter.listeners import RobotKeywordsIndexerListener, StatusEventListener
+
+
+CELL = """\
+*** Test Cases ***
+Passing Test
+    Log  Hello
+"""
+
+
+def test_phase_metrics():
+    metrics = PhaseMetrics("operation")
+    with metrics.phase("total"):
+        for _ in range(2):
+            with metrics.phase("step"):
+                sum(range(10000))
+
+    assert list(metrics.phases) == ["step", "total"]
+    assert 0 < metrics.wall("step") <= metrics.wall()
+    assert metrics.cpu("unknown") == 0
+    assert "step" in str(metrics)
+    assert set(metrics.as_dict()["total"]) == {"wall", "cpu"}
+
+
+def test_histogram():
+    histogram = Histogram()
+    for value in [0.001] * 9 + [1.]:
+        histogram.add(value)
+
+    assert histogram.count == 10
+    assert histogram.max == 1.
+    assert 0.001 <= histogram.quantile(0.5) < 0.002
+    assert histogram.quantile(1) == 1.
+
+    session = SessionMetrics()
+    metrics = PhaseMetrics("operation")
+    metrics.add("total", 0.5, 0.25)
+    session.record(metrics)
+    session.record(metrics)
+    summary, = session.summary()
+    assert (summary["operation"], summary["phase"], summary["count"], summary["cpu"]) == ("operation", "total", 2, 0.25)
+    assert "<table>" in session._repr_html_()
+
+
+def test_execute_metrics():
+    suite = init_suite("test suite")
+    events = []
+    listener = StatusEventListener(events.append)
+    metrics = PhaseMetrics()
+
+    SESSION_METRICS.clear()
+    execute(CELL, suite, listeners=[listener], metrics=metrics)
+
+    assert metrics.operation == "execute"
+    for phase in ("highlights", "parse", "merge", "run", "listeners", "report", "screenshots", "log", "total"):
+        assert phase in metrics.phases
+    assert metrics.wall("run") <= metrics.wall()
+    assert events
+    assert {row["phase"] for row in SESSION_METRICS.summary()} == set(metrics.phases)
+
+    # Nothing is timed nor recorded without metrics
+    execute(CELL, suite, listeners=[listener])
+    assert {row["count"] for row in SESSION_METRICS.summary()} == {1}
+
+    assert complete("Log", 3, suite)["matches"] == []
+    assert not inspect("Unknown Keyword", 7, suite, RobotKeywordsIndexerListener())["found"]
+    assert {row["operation"] for row in SESSION_METRICS.summary()} == {"execute"}
+
+
+def test_complete_inspect_metrics():
+    suite = init_suite("test suite")
+    listener = RobotKeywordsIndexerListener()
+
+    metrics = PhaseMetrics()
+    complete("Log", 3, suite, listener, metrics=metrics)
+    assert list(metrics.phases) == ["context", "matches", "total"]
+
+    metrics = PhaseMetrics()
+    assert not inspect("Unknown Keyword", 7, suite, listener, metrics=metrics)["found"]
+    assert list(metrics.phases) == ["lookup", "total"]
+
+
+def test_timed_listener():
+    class Listener:
+        ROBOT_LISTENER_API_VERSION = 2
+
+        def end_test(self, name, attributes):
+            return name
+
+    metrics = PhaseMetrics()
+    proxy = TimedListener(Listener(), metrics)
+
+    assert proxy.ROBOT_LISTENER_API_VERSION == 2
+    assert proxy.end_test("Test", {}) == "Test"
+    assert not hasattr(proxy, "start_test")
+    assert "listeners" in metrics.phases
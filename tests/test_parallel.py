@@ -0,0 +1,143 @@
+import logging
+import os
+import sys
+import time
+
+import pytest
+
+from robotframework_interpreter import init_suite, execute, StatusEventListener, WorkerPool
+from robotframework_interpreter.interpreter import TestSuiteError
+from robotframework_interpreter.parallel import WorkerError, get_snapshot, load_snapshot, partition
+from robotframework_interpreter.robot_version import ROBOT_MAJOR_VERSION
+
+
+CELL1 = """\
+*** Settings ***
+Library  Collections
+
+*** Variables ***
+${EXPECTED}  1
+
+*** Keywords ***
+Head Should Be Expected
+    [Arguments]  @{items}
+    ${list}=  Create List  @{items}
+    Should Be Equal  ${list}[0]  ${EXPECTED}
+"""
+
+CELL2 = """\
+*** Test Cases ***
+First
+    Head Should Be Expected  1  2
+
+Second
+    Head Should Be Expected  2  1
+
+Third
+    Head Should Be Expected  1
+
+Fourth
+    Head Should Be Expected  1  3
+"""
+
+
+def test_partition():
+    assert partition(list('abcde'), 2) == [([0, 2, 4], ['a', 'c', 'e']), ([1, 3], ['b', 'd'])]
+    assert partition(list('a'), 3) == [([0], ['a'])]
+
+
+def test_snapshot():
+    suite = init_suite('test suite')
+    execute(CELL1, suite)
+    test = suite.tests.create(name='Test')
+    if ROBOT_MAJOR_VERSION == 4:
+        test.body.create_keyword('Head Should Be Expected', args=['1'])
+    else:
+        test.keywords.create('Head Should Be Expected', args=['1'])
+
+    copy = load_snapshot(get_snapshot(suite, suite.tests))
+    assert [test.name for test in copy.tests] == ['Test']
+    assert copy.tests[0].parent is copy
+    assert [keyword.name for keyword in copy.resource.keywords] == ['Head Should Be Expected']
+
+
+def test_parallel_execution():
+    suite = init_suite('test suite')
+    execute(CELL1, suite)
+
+    result, report = execute(CELL2, suite, workers=2)
+
+    assert [test.name for test in result.suite.tests] == ['First', 'Second', 'Third', 'Fourth']
+    assert [test.status for test in result.suite.tests] == ['PASS', 'FAIL', 'PASS', 'PASS']
+    assert 'text/html' in report
+    assert not suite.tests
+
+
+def test_parallel_execution_warnings(caplog):
+    suite = init_suite('test suite')
+    execute(CELL1, suite)
+
+    events = []
+    with caplog.at_level(logging.WARNING):
+        execute(CELL2, suite, workers=2, listeners=[StatusEventListener(events.append)],
+                logger=logging.getLogger('test'))
+
+    assert not events
+    assert 'not notified of the tests run in worker processes: StatusEventListener' in caplog.text
+    assert 'not written to stdout' not in caplog.text
+
+
+def test_worker_pool():
+    with WorkerPool(size=1, max_tasks=2, timeout=5) as pool:
+        first = pool.submit(os.getpid).result()
+        assert pool.submit(os.getpid).result() == first
+        # The worker was recycled after two tasks
+        assert pool.submit(os.getpid).result() != first
+
+        with pytest.raises(WorkerError):
+            pool.submit(os._exit, 1).result()
+        with pytest.raises(ValueError):
+            pool.submit(int, 'not a number').result()
+        assert pool.submit(sum, [1, 2]).result() == 3
+
+    with WorkerPool(size=1, max_memory=1) as pool:
+        assert pool.submit(os.getpid).result() != pool.submit(os.getpid).result()
+
+    with WorkerPool(size=1, timeout=0.5) as pool:
+        with pytest.raises(WorkerError):
+            pool.submit(time.sleep, 10).result()
+        assert pool.submit(sum, [1, 2]).result() == 3
+
+
+def get_imported_modules():
+    return os.getpid(), set(sys.modules)
+
+
+def test_worker_pool_preload():
+    with WorkerPool(size=1) as pool:
+        # Checked before this module, which imports them, gets imported in the worker
+        imported = "[name for name in ('IPython', 'ipywidgets') if name in __import__('sys').modules]"
+        assert pool.submit(eval, imported).result() == []
+
+        pid, modules = pool.submit(get_imported_modules).result()
+        assert 'robot.libraries.Collections' not in modules
+
+        pool.preload(['Collections'])
+        # The pre-started worker imports the library right away
+        pool._dispatchers.submit(lambda: None).result()
+        assert pool._idle.queue[0].libraries == {'Collections'}
+        assert pool.submit(get_imported_modules).result()[0] == pid
+        assert 'robot.libraries.Collections' in pool.submit(get_imported_modules).result()[1]
+
+
+def test_pool_execution():
+    suite = init_suite('test suite')
+
+    with WorkerPool(size=2) as pool:
+        execute(CELL1, suite, execution_pool=pool)
+        result, report = execute(CELL2, suite, execution_pool=pool, workers=2)
+        assert [test.status for test in result.suite.tests] == ['PASS', 'FAIL', 'PASS', 'PASS']
+        assert 'Collections' in pool.libraries
+
+        with pytest.raises(TestSuiteError):
+            execute('*** Settings ***\nLibrary  NotExistingLibrary\n', suite, execution_pool=pool)
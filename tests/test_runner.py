@@ -0,0 +1,78 @@
+import json
+import os
+
+from robot.api import ExecutionResult
+
+from robotframework_interpreter.report import get_statistics
+from robotframework_interpreter.runner import find_notebooks, main, read_cells, run_notebooks
+
+
+def write_notebook(path, cells):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fp:
+        json.dump({
+            "cells": [
+                {"cell_type": "markdown", "source": ["# Title"]},
+            ] + [
+                {"cell_type": "code", "source": cell.splitlines(keepends=True), "outputs": []}
+                for cell in cells
+            ],
+            "nbformat": 4,
+            "nbformat_minor": 4,
+        }, fp)
+    return str(path)
+
+
+PASSING = [
+    "*** Settings ***\nLibrary  Collections\n",
+    "*** Test Cases ***\nFirst\n    ${list}=  Create List  a\n    Length Should Be  ${list}  1\n",
+    "*** Test Cases ***\nSecond\n    Log  Hello\n",
+]
+
+FAILING = [
+    "*** Test Cases ***\nFailing\n    Fail  Failure\n",
+]
+
+
+def test_read_cells(tmp_path):
+    path = write_notebook(str(tmp_path / "notebook.ipynb"), PASSING)
+    assert read_cells(path) == PASSING
+    assert find_notebooks([str(tmp_path)]) == [path]
+
+
+def test_runner(tmp_path, capsys):
+    write_notebook(str(tmp_path / "notebooks" / "passing.ipynb"), PASSING)
+    write_notebook(str(tmp_path / "notebooks" / "other" / "failing.ipynb"), FAILING)
+    outputdir = str(tmp_path / "results")
+
+    assert main([str(tmp_path / "notebooks"), "-d", outputdir, "-j", "2"]) == 1
+    assert "PASS" in capsys.readouterr().out
+
+    result = ExecutionResult(os.path.join(outputdir, "passing", "output.xml"))
+    assert get_statistics(result) == (2, 0, 0)
+    assert [suite.name for suite in result.suite.suites] == ["Cell 2", "Cell 3"]
+    assert os.path.exists(os.path.join(outputdir, "other", "failing", "xunit.xml"))
+
+    broken = tmp_path / "broken.ipynb"
+    broken.write_text("not json")
+    summaries = list(run_notebooks([str(broken)], outputdir, processes=1))
+    assert summaries[0]["errors"]
+
+
+REDEFINING = [
+    "*** Keywords ***\nValue\n    [Return]  1\n",
+    "*** Test Cases ***\nFirst Value\n    ${value}=  Value\n    Should Be Equal  ${value}  1\n",
+    "*** Keywords ***\nValue\n    [Return]  2\n",
+]
+
+
+def test_runner_batch(tmp_path):
+    path = write_notebook(str(tmp_path / "redefining.ipynb"), REDEFINING)
+
+    # Cells are run one by one by default, the test using the keyword defined before it
+    summary, = run_notebooks([path], str(tmp_path / "results"), processes=1)
+    assert (summary["passed"], summary["failed"]) == (1, 0)
+
+    # In batch mode, tests run once all the keywords are defined
+    summary, = run_notebooks([path], str(tmp_path / "batch"), processes=1, batch=True)
+    assert (summary["passed"], summary["failed"]) == (0, 1)
@@ -0,0 +1,34 @@
+import os
+
+from robot.api import ExecutionResult
+
+from robotframework_interpreter import init_suite, execute, SessionResult
+from robotframework_interpreter.report import get_statistics
+
+
+CELL = """\
+*** Test Cases ***
+Passing Test
+    Log  Hello
+
+Failing Test
+    Fail  Failure
+"""
+
+
+def test_session_result(tmp_path):
+    session = SessionResult()
+    suite = init_suite('test suite')
+
+    result, _ = execute(CELL, suite, session_result=session, log_mode='lazy')
+    execute(CELL, suite, session_result=session, log_mode='lazy')
+    assert len(session) == 2
+    assert result.suite.parent is None
+
+    output, log = session.export(str(tmp_path))
+    assert os.path.exists(log)
+
+    exported = ExecutionResult(output)
+    assert [child.name for child in exported.suite.suites] == ['Cell 1', 'Cell 2']
+    assert get_statistics(exported)[1] == 2
+    assert len({test.id for child in exported.suite.suites for test in child.tests}) == 4
@@ -0,0 +1,55 @@
+from robot.running.model import TestSuite, UserKeyword
+
+from robotframework_interpreter.store import ResourceJournal, get_resource_index, normalize_name
+
+
+def test_resource_journal():
+    suite = TestSuite(name='test suite')
+    suite.resource.imports.library('Collections')
+    first = suite.resource.keywords.create(name='First')
+    second = suite.resource.keywords.create(name='Second')
+
+    journal = ResourceJournal(suite.resource)
+
+    suite.resource.imports.library('String')
+    replacement = UserKeyword(name='first')
+    third = UserKeyword(name='Third')
+    journal.insert('keywords', replacement)
+    journal.insert('keywords', third)
+
+    assert list(suite.resource.keywords) == [replacement, second, third]
+    assert journal.added('keywords') == [replacement, third]
+    assert journal.shadowed('keywords') == ['First']
+    assert [item.name for item in journal.added('imports')] == ['String']
+
+    journal.revert()
+
+    assert list(suite.resource.keywords) == [first, second]
+    assert [item.name for item in suite.resource.imports] == ['Collections']
+    assert journal.added('keywords') == []
+    assert get_resource_index(suite.resource).find('keywords', 'Third') is None
+    assert get_resource_index(suite.resource).find('keywords', 'first') is first
+
+
+def test_normalize_name():
+    assert normalize_name('My Keyword') == normalize_name('my_keyword')
+    assert normalize_name('${My Var}') == normalize_name('@{myvar}')
+    assert normalize_name('${My Var}') == 'myvar'
+
+
+def test_resource_index():
+    suite = TestSuite(name='test suite')
+    suite.resource.keywords.create(name='Keyword')
+    duplicate = suite.resource.keywords.create(name='key word')
+    variable = suite.resource.variables.create(name='${VAR}', value=['1'])
+
+    index = get_resource_index(suite.resource)
+
+    assert list(suite.resource.keywords) == [duplicate]
+    assert index.find('keywords', 'KEYWORD') is duplicate
+    assert index.find('variables', '${var}') is variable
+
+    other = UserKeyword(name='Other')
+    assert index.insert('keywords', other) is None
+    assert index.insert('keywords', UserKeyword(name='OTHER')) == (1, other)
+    assert len(suite.resource.keywords) == 2
@@ -1,4 +1,17 @@
-from robotframework_interpreter.utils import detect_robot_context
+import base64
+import gzip
+from io import BytesIO
+
+from PIL import Image
+
+from robot.result import Result
+
+from robotframework_interpreter.robot_version import ROBOT_MAJOR_VERSION
+from robotframework_interpreter.cache import LRUCache
+from robotframework_interpreter.utils import (
+    ScreenshotOptions, detect_robot_context, display_log, encode_screenshots, process_result_screenshots, process_screenshots,
+    screenshot_data_uri
+)
 
 
 def test_detect_robot_context():
@@ -81,3 +94,110 @@ This is a task
         )
         == "__tasks__"
     )
+
+
+def test_process_result_screenshots(tmp_path):
+    Image.new("RGB", (4, 4)).save(str(tmp_path / "screenshot.png"))
+
+    result = Result()
+    test = result.suite.tests.create(name="Test")
+    html = '</td></tr><tr><td colspan="3"><a href="screenshot.png"><img src="screenshot.png" width="800px"></a>'
+    if ROBOT_MAJOR_VERSION == 4:
+        keyword = test.body.create_keyword(kwname="Capture Page Screenshot")
+        msg = keyword.body.create_message(html, html=True)
+    else:
+        keyword = test.keywords.create(kwname="Capture Page Screenshot")
+        msg = keyword.messages.create(html, html=True)
+
+    process_result_screenshots(result, str(tmp_path))
+
+    message = msg.message
+    assert 'a href=' not in message
+    assert 'img src="data:image/png;base64,' in message
+    assert 'style="max-width:800px;"' in message
+
+
+def test_process_screenshots(tmp_path):
+    messages = []
+    for index in range(500):
+        Image.new("RGB", (4, 4), (index % 256, 0, 0)).save(str(tmp_path / f"screenshot-{index}.png"))
+        messages.append(
+            '<msg level="INFO" html="true">&lt;/td&gt;&lt;/tr&gt;&lt;tr&gt;&lt;td colspan="3"&gt;'
+            f'&lt;a href="screenshot-{index}.png"&gt;&lt;img src="screenshot-{index}.png" width="800px"&gt;&lt;/a&gt;</msg>'
+        )
+    messages.append('<msg level="INFO" html="true">&lt;a href="missing.png"&gt;&lt;img src="missing.png"&gt;&lt;/a&gt;</msg>')
+    (tmp_path / "output.xml").write_text("<robot>\n" + "\n".join(messages) + "\n</robot>\n", encoding="utf-8")
+
+    process_screenshots(str(tmp_path))
+
+    xml = (tmp_path / "output.xml").read_text(encoding="utf-8")
+    assert xml.count('img src="data:image/png;base64,') == 500
+    assert xml.count('style="max-width:800px;"') == 500
+    assert xml.count('a href=') == 1
+    assert 'img src="missing.png"' in xml
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == ".xml"] == ["output.xml"]
+
+
+def test_encode_screenshots(tmp_path):
+    Image.new("RGB", (4, 4)).save(str(tmp_path / "first.png"))
+    Image.new("RGB", (4, 4)).save(str(tmp_path / "second.png"))
+    Image.new("RGB", (8, 8)).save(str(tmp_path / "third.png"))
+    cache = LRUCache()
+
+    uris = encode_screenshots(["first.png", "second.png", "third.png", "first.png", "missing.png"], str(tmp_path), cache)
+
+    assert uris["first.png"] == uris["second.png"]
+    assert uris["first.png"] != uris["third.png"]
+    assert uris["missing.png"] is None
+    assert len(cache) == 2
+
+    encode_screenshots(["third.png"], str(tmp_path), cache)
+
+    assert cache.info()["hits"] >= 1
+
+
+def test_screenshot_options(tmp_path):
+    Image.new("RGBA", (3840, 2160), (255, 0, 0, 255)).save(str(tmp_path / "capture.png"))
+    original = (tmp_path / "capture.png").read_bytes()
+
+    options = ScreenshotOptions(max_width=800, format="jpeg", quality=70)
+    uri = screenshot_data_uri("capture.png", str(tmp_path), options=options)
+
+    assert uri.startswith("data:image/jpeg;base64,")
+    image = Image.open(BytesIO(base64.b64decode(uri.split(",", 1)[1])))
+    assert image.size == (800, 450)
+    assert (tmp_path / "capture.png").read_bytes() == original
+
+    assert screenshot_data_uri("capture.png", str(tmp_path)).startswith("data:image/png;base64,")
+
+
+def test_display_log():
+    html = b"<html><body>" + b"<p>Robot log</p>" * 1000 + b"</body></html>"
+
+    script = display_log(html, "log.html")
+    content = script.split("'")[1]
+
+    assert gzip.decompress(base64.b64decode(content)) == html
+    assert len(content) < len(html) / 5
+    assert '"' not in script
+
+    script = display_log(html, "log.html", compress=False)
+    assert base64.b64decode(script.split("'")[1]) == html
+
+
+def test_cache_size_limit():
+    cache = LRUCache(maxsize=10, maxbytes=10)
+    cache.put("first", "12345")
+    cache.put("second", "1234")
+    cache.put("third", "123")
+
+    assert "first" not in cache
+    assert cache.info()["currbytes"] == 7
+
+    cache.put("second", "12345678")
+    assert "third" not in cache
+    assert cache.info()["currbytes"] == 8
+
+    cache.put("large", "12345678901")
+    assert "large" not in cache
+    assert "second" in cache